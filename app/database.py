@@ -1,6 +1,6 @@
 import os
 import base64
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # SQLite Database URL
@@ -32,6 +32,23 @@ class User(Base):
     voice_credits_seconds = Column(Integer, default=120)
     first_project_created = Column(Integer, default=0)  # 0 = false, 1 = true
 
+class OCRJobRecord(Base):
+    """Background OCR job state, shared by all server workers"""
+    __tablename__ = "ocr_jobs"
+
+    job_id = Column(String, primary_key=True)
+    owner_id = Column(Integer, index=True)
+    filename = Column(String)
+    status = Column(String)
+    pages_done = Column(Integer, default=0)
+    pages_total = Column(Integer, nullable=True)
+    text = Column(Text, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(Float)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True, index=True)
+    updated_at = Column(Float)  # Heartbeat from the worker running the job
+
 # Create all tables (if they don't exist yet)
 Base.metadata.create_all(bind=engine)
 
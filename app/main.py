@@ -3,22 +3,30 @@ Indic Scribe - OCR Application
 FastAPI server for optical character recognition and speech-to-text
 """
 import os
+import asyncio
 import logging
+import threading
 import time
+import zipfile
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from dotenv import load_dotenv
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from app.services.auth import oauth
 from app.services.drive_client import list_projects, save_project, load_project, get_or_create_indicscribe_folder
-from app.database import get_db, get_or_create_user, User
+from app.database import get_db, get_or_create_user, User, SessionLocal
+from app.services.ocr_jobs import get_job_manager, OCRJob
+from app.services.ocr_executor import get_ocr_executor, OCRExecutorBusy
+from app.services.vision_retry import OCRCancelled
 import tempfile
 import shutil
+import json
 from pydantic import BaseModel, Field
 
 # Configure logging with a more structured format
@@ -34,6 +42,24 @@ class OCRResponse(BaseModel):
     text: str = Field(..., description="The extracted text from the document")
     processing_time_seconds: float = Field(..., description="Time taken to process the document")
 
+class OCRJobStatus(BaseModel):
+    job_id: str = Field(..., description="Identifier to poll for job progress")
+    status: str = Field(..., description="One of queued, running, completed, failed")
+    filename: Optional[str] = Field(None, description="Name of the uploaded file")
+    pages_done: int = Field(0, description="Number of pages processed so far")
+    pages_total: Optional[int] = Field(None, description="Total pages to process, once known")
+    text: Optional[str] = Field(None, description="The extracted text, once the job has completed")
+    error: Optional[str] = Field(None, description="Failure reason if the job failed")
+    processing_time_seconds: Optional[float] = Field(None, description="Time taken to process the document")
+
+class OCRBatchFileResult(BaseModel):
+    filename: str = Field(..., description="Name of the uploaded file (or path inside an uploaded zip)")
+    text: str = Field(..., description="The extracted text from the file")
+
+class OCRBatchResponse(BaseModel):
+    files: List[OCRBatchFileResult] = Field(..., description="Results in upload order")
+    processing_time_seconds: float = Field(..., description="Time taken to process the whole batch")
+
 class SaveProjectRequest(BaseModel):
     name: str = Field(..., description="Project name (will be prefixed with 'IndicScribe_')")
     content: dict = Field(..., description="Editor state (Quill Delta/HTML)")
@@ -211,9 +237,15 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)):
 # --- Existing Endpoints ---
 
 @app.get("/health")
-async def health_check() -> Dict[str, str]:
+async def health_check() -> Dict[str, Any]:
     """Health check endpoint"""
-    return {"status": "Google Stack Active"}
+    health: Dict[str, Any] = {"status": "Google Stack Active", "ocr_executor": get_ocr_executor().stats()}
+    try:
+        # Reads the checkpoint database (and may build the client), so keep it off the event loop
+        health["vision"] = await run_in_threadpool(lambda: get_google_client().stats())
+    except Exception as e:
+        health["vision"] = {"error": str(e)}
+    return health
 
 @app.get("/")
 async def root():
@@ -304,8 +336,50 @@ async def test_folder_creation(user: User = Depends(get_current_user)):
             "error_type": type(e).__name__
         }
 
+def _save_upload_to_tempfile(file: UploadFile) -> str:
+    """Spool an upload to a temporary file to avoid keeping large bytes in memory"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp_file:
+        shutil.copyfileobj(file.file, tmp_file)
+        return tmp_file.name
+
+async def _watch_for_disconnect(request: Request, cancel: threading.Event) -> None:
+    """
+    Set `cancel` once the client goes away.
+    Waits on the ASGI receive channel rather than polling request.is_disconnected(), which
+    never reports a disconnect behind @app.middleware("http") (BaseHTTPMiddleware).
+    The body has already been read, so the next message is http.disconnect.
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            cancel.set()
+            return
+
+async def _run_ocr_until_disconnect(request: Request, fn, *args, owner: Optional[int] = None, **kwargs) -> Any:
+    """
+    Run an OCR call on the executor (admitted fairly among owners, i.e. users), cancelling it
+    if the client disconnects first.
+    The call must accept cancel_event; on disconnect it is set, the call is awaited while the
+    pipeline winds down (so the upload isn't deleted under it) and OCRCancelled is raised.
+    """
+    cancel = threading.Event()
+    watcher = asyncio.ensure_future(_watch_for_disconnect(request, cancel))
+    try:
+        result = await get_ocr_executor().run(fn, *args, owner=owner, cancel_event=cancel, **kwargs)
+    except OCRCancelled:
+        if not cancel.is_set():
+            raise
+        result = None
+    finally:
+        watcher.cancel()
+    if cancel.is_set():
+        logger.info("Client disconnected, OCR cancelled")
+        raise OCRCancelled("Client disconnected")
+    return result
+
 @app.post("/api/ocr", response_model=OCRResponse)
 async def ocr(
+    request: Request,
     file: UploadFile = File(...),
     page_start: Optional[int] = Form(None),
     page_end: Optional[int] = Form(None),
@@ -328,9 +402,7 @@ async def ocr(
         start_time = time.time()
         
         # Save to temporary file to avoid keeping large bytes in memory
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp_file:
-            shutil.copyfileobj(file.file, tmp_file)
-            tmp_path = tmp_file.name
+        tmp_path = _save_upload_to_tempfile(file)
         
         try:
             # Process OCR using the file path
@@ -338,7 +410,10 @@ async def ocr(
             vision_service = google_client.get_vision_service()
             
             logger.info(f"Running text detection on {tmp_path} (auto-lang)...")
-            extracted_text = vision_service.detect_text_from_path(tmp_path, page_start=page_start, page_end=page_end)
+            extracted_text = await _run_ocr_until_disconnect(
+                request, vision_service.detect_text_from_path, tmp_path, page_start=page_start, page_end=page_end,
+                owner=user.id, flow=user.id,
+            )
             
             processing_time = time.time() - start_time
             logger.info(f"OCR complete in {processing_time:.2f}s")
@@ -355,10 +430,253 @@ async def ocr(
         
     except HTTPException:
         raise
+    except OCRCancelled:
+        # Nobody is waiting for the response; no credit is deducted
+        logger.info("OCR request cancelled by client")
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except OCRExecutorBusy as e:
+        logger.warning(f"OCR rejected: {e}")
+        raise HTTPException(status_code=503, detail="OCR service is busy. Please try again shortly.")
     except Exception as e:
         logger.error(f"Error in OCR: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/ocr/stream")
+async def ocr_stream(
+    file: UploadFile = File(...),
+    page_start: Optional[int] = Form(None),
+    page_end: Optional[int] = Form(None),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming variant of /api/ocr.
+    Responds with NDJSON: one {"page": N, "text": "--- Page N ---\\n..."} line per page
+    in page order as soon as it is recognized, then a final
+    {"done": true, "pages": count, "processing_time_seconds": t} line
+    (or {"error": "..."} if processing failed part-way).
+    """
+    if user.ocr_credits <= 0:
+        raise HTTPException(status_code=402, detail="Payment Required: Not enough OCR credits")
+
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    logger.info(f"Streaming OCR request: {file.filename} ({file.content_type})")
+    start_time = time.time()
+    tmp_path = _save_upload_to_tempfile(file)
+    vision_service = get_google_client().get_vision_service()
+
+    def cleanup() -> None:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    async def generate():
+        pages = 0
+        # Set when the client disconnects (Starlette then cancels this generator), which stops the OCR pipeline
+        cancel = threading.Event()
+        try:
+            # The upload is deleted once the pipeline has wound down, not when the client goes away
+            async for page_num, chunk in get_ocr_executor().stream(
+                vision_service.iter_text_from_path, tmp_path, page_start=page_start, page_end=page_end,
+                cancel_event=cancel, stop=cancel, owner=user.id, flow=user.id, on_finish=cleanup,
+            ):
+                pages += 1
+                yield json.dumps({"page": page_num, "text": chunk}, ensure_ascii=False) + "\n"
+
+            processing_time = time.time() - start_time
+            logger.info(f"Streaming OCR complete in {processing_time:.2f}s ({pages} pages)")
+
+            # Deduct credit
+            user.ocr_credits -= 1
+            db.commit()
+
+            yield json.dumps({"done": True, "pages": pages, "processing_time_seconds": processing_time}) + "\n"
+        except OCRExecutorBusy as e:
+            logger.warning(f"Streaming OCR rejected: {e}")
+            yield json.dumps({"error": "OCR service is busy. Please try again shortly."}) + "\n"
+        except Exception as e:
+            logger.error(f"Error in streaming OCR: {e}", exc_info=True)
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+# Files a zip upload may contribute to a batch; anything else in the archive is ignored
+BATCH_ZIP_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".webp", ".bmp", ".gif"}
+BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", "200"))
+BATCH_MAX_UNZIPPED_BYTES = int(os.getenv("OCR_BATCH_MAX_UNZIPPED_BYTES", str(1024 * 1024 * 1024)))
+
+def _expand_batch_uploads(files: List[UploadFile], work_dir: str) -> List[Tuple[str, str]]:
+    """
+    Spool batch uploads into work_dir and return (filename, path) pairs in upload order.
+    Zip archives are replaced by their image/PDF members, sorted by path.
+    """
+    too_many = HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_FILES} files")
+    if len(files) > BATCH_MAX_FILES:
+        raise too_many
+    entries: List[Tuple[str, str]] = []
+    unzipped_bytes = 0
+    for upload_idx, file in enumerate(files):
+        path = os.path.join(work_dir, f"{upload_idx}{Path(file.filename).suffix}")
+        with open(path, "wb") as out:
+            shutil.copyfileobj(file.file, out)
+        if not zipfile.is_zipfile(path):
+            entries.append((file.filename, path))
+            continue
+
+        with zipfile.ZipFile(path) as archive:
+            members = sorted(
+                (info for info in archive.infolist()
+                 if not info.is_dir()
+                 and not Path(info.filename).name.startswith(".")
+                 and "__MACOSX" not in info.filename
+                 and Path(info.filename).suffix.lower() in BATCH_ZIP_EXTENSIONS),
+                key=lambda info: info.filename,
+            )
+            # Checked against the central directory before anything is extracted; the uploads
+            # still to come count at least one file each
+            if len(entries) + len(members) + len(files) - upload_idx - 1 > BATCH_MAX_FILES:
+                raise too_many
+            unzipped_bytes += sum(info.file_size for info in members)
+            if unzipped_bytes > BATCH_MAX_UNZIPPED_BYTES:
+                raise HTTPException(status_code=413, detail="Zip contents are too large")
+            for member_idx, info in enumerate(members):
+                member_path = os.path.join(work_dir, f"{upload_idx}-{member_idx}{Path(info.filename).suffix}")
+                with archive.open(info) as src, open(member_path, "wb") as out:
+                    shutil.copyfileobj(src, out)
+                entries.append((f"{file.filename}/{info.filename}", member_path))
+        os.remove(path)
+
+    return entries
+
+@app.post("/api/ocr/batch", response_model=OCRBatchResponse)
+async def ocr_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    OCR many images/PDFs (or zips of them) in one request.
+    All pages share the Vision worker pool, so the batch finishes in about the time of its
+    slowest document. Costs one credit per file, as if each had been sent to /api/ocr.
+    """
+    if user.ocr_credits <= 0:
+        raise HTTPException(status_code=402, detail="Payment Required: Not enough OCR credits")
+
+    work_dir = tempfile.mkdtemp(prefix="ocr-batch-")
+    try:
+        # Spooling and unzipping can take seconds for big archives; keep it off the event loop
+        entries = await run_in_threadpool(_expand_batch_uploads, files, work_dir)
+        if not entries:
+            raise HTTPException(status_code=400, detail="No files provided")
+        if user.ocr_credits < len(entries):
+            raise HTTPException(
+                status_code=402, detail=f"Payment Required: {len(entries)} OCR credits needed, {user.ocr_credits} left"
+            )
+
+        logger.info(f"Batch OCR request: {len(entries)} files")
+        start_time = time.time()
+        vision_service = get_google_client().get_vision_service()
+        texts = await _run_ocr_until_disconnect(
+            request, vision_service.detect_text_batch, [path for _, path in entries], owner=user.id, flow=user.id
+        )
+
+        processing_time = time.time() - start_time
+        logger.info(f"Batch OCR complete in {processing_time:.2f}s ({len(entries)} files)")
+
+        # Deduct credits
+        user.ocr_credits -= len(entries)
+        db.commit()
+
+        return OCRBatchResponse(
+            files=[OCRBatchFileResult(filename=name, text=text or "") for (name, _), text in zip(entries, texts)],
+            processing_time_seconds=processing_time,
+        )
+    except HTTPException:
+        raise
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip file: {e}")
+    except OCRCancelled:
+        logger.info("Batch OCR request cancelled by client")
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except OCRExecutorBusy as e:
+        logger.warning(f"Batch OCR rejected: {e}")
+        raise HTTPException(status_code=503, detail="OCR service is busy. Please try again shortly.")
+    except Exception as e:
+        logger.error(f"Error in batch OCR: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+@app.post("/api/ocr/jobs", response_model=OCRJobStatus, status_code=202)
+async def submit_ocr_job(
+    file: UploadFile = File(...),
+    page_start: Optional[int] = Form(None),
+    page_end: Optional[int] = Form(None),
+    user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Queue an OCR job and return immediately with a job ID.
+    Poll GET /api/ocr/jobs/{job_id} for progress and the final text.
+    The credit is only charged if the job completes.
+    """
+    if user.ocr_credits <= 0:
+        raise HTTPException(status_code=402, detail="Payment Required: Not enough OCR credits")
+
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    logger.info(f"OCR job request: {file.filename} ({file.content_type})")
+    tmp_path = _save_upload_to_tempfile(file)
+    user_id = user.id
+
+    def run(job: OCRJob) -> str:
+        vision_service = get_google_client().get_vision_service()
+        return vision_service.detect_text_from_path(
+            tmp_path,
+            page_start=page_start,
+            page_end=page_end,
+            progress_callback=job.update_progress,
+            flow=user_id,
+            raise_errors=True,
+        )
+
+    def deduct_credit(job: OCRJob) -> None:
+        db = SessionLocal()
+        try:
+            job_user = db.query(User).filter(User.id == user_id).first()
+            if job_user:
+                job_user.ocr_credits -= 1
+                db.commit()
+        finally:
+            db.close()
+
+    def cleanup(job: OCRJob) -> None:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    try:
+        job = get_job_manager().submit(user_id, file.filename, run, on_success=deduct_credit, on_finish=cleanup)
+    except OCRExecutorBusy as e:
+        cleanup(None)
+        logger.warning(f"OCR job rejected: {e}")
+        raise HTTPException(status_code=503, detail="OCR service is busy. Please try again shortly.")
+    except Exception as e:
+        cleanup(None)
+        logger.error(f"Error queueing OCR job: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return job.to_dict()
+
+@app.get("/api/ocr/jobs/{job_id}", response_model=OCRJobStatus)
+async def get_ocr_job(job_id: str, user: User = Depends(get_current_user)) -> Any:
+    """Return progress of an OCR job, including the text once it has completed"""
+    job = get_job_manager().get(job_id)
+    if not job or job.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="OCR job not found")
+    return job.to_dict()
+
 # --- Project Management Routes ---
 
 @app.get("/api/projects")
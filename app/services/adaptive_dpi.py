@@ -0,0 +1,190 @@
+"""
+Adaptive Rasterization DPI
+Picks a render resolution per PDF page instead of a fixed 200 dpi.
+
+Each page's media box gives its physical size; a cheap low-resolution probe
+render gives the line pitch of its text. Pages are rendered at the DPI that
+makes text lines `target_line_px` tall, or, when no text lines can be found
+(photos, blank pages), at the DPI that fits the page into `pixel_budget`.
+Large-format pages with big type get fewer pixels; small print gets more.
+"""
+import os
+import re
+import math
+import logging
+import statistics
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE_KEY = re.compile(r"Page\s+(\d+)\s+size")
+_PAGE_SIZE_VALUE = re.compile(r"([\d.]+)\s*x\s*([\d.]+)\s*pts")
+
+
+def parse_page_sizes(info: Dict[str, Any]) -> Dict[int, Tuple[float, float]]:
+    """
+    Extract per-page sizes in points from pdfinfo output parsed by pdf2image.
+    pdfinfo only reports them when run with a page range ("Page    3 size: 595 x 842 pts (A4)").
+    """
+    sizes: Dict[int, Tuple[float, float]] = {}
+    for key, value in info.items():
+        key_match = _PAGE_SIZE_KEY.match(key)
+        value_match = _PAGE_SIZE_VALUE.search(str(value))
+        if key_match and value_match:
+            sizes[int(key_match.group(1))] = (float(value_match.group(1)), float(value_match.group(2)))
+    return sizes
+
+
+def estimate_line_pitch(image: Image.Image) -> Optional[float]:
+    """
+    Median distance in pixels between consecutive text lines of a rendered page, or None
+    if the page doesn't look like lines of text. Uses the row-wise mean intensity profile,
+    computed by Pillow by squeezing the page into a one-pixel-wide column.
+    """
+    gray = image if image.mode == "L" else image.convert("L")
+    width, height = gray.size
+    if height < 20:
+        return None
+    profile = list(gray.resize((1, height), Image.BOX).getdata())
+
+    background, darkest = max(profile), min(profile)
+    if background - darkest < 8:
+        return None  # Blank or uniform page
+    threshold = background - (background - darkest) * 0.25
+
+    starts: List[int] = []
+    heights: List[int] = []
+    run_start = None
+    for y, value in enumerate(profile + [background]):
+        if value < threshold and run_start is None:
+            run_start = y
+        elif value >= threshold and run_start is not None:
+            starts.append(run_start)
+            heights.append(y - run_start)
+            run_start = None
+
+    if len(starts) < 3:
+        return None
+    pitch = statistics.median(b - a for a, b in zip(starts, starts[1:]))
+    # Lines merged into solid blocks (print too small for the probe) or a photo: not measurable
+    if pitch < 4 or statistics.median(heights) > 0.9 * pitch:
+        return None
+    return pitch
+
+
+class DPIPlanner:
+    """
+    Chooses a render DPI per page from its size and a low-resolution probe render.
+    Results are rounded to `step` so consecutive pages usually share a DPI and can be
+    rendered with a single poppler call.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        default_dpi: int = 200,
+        pixel_budget: int = 4_000_000,
+        target_line_px: int = 36,
+        min_dpi: int = 100,
+        max_dpi: int = 400,
+        probe_size: int = 1200,
+        step: int = 25,
+        escalate_below: float = 0.0,
+        first_pass_scale: float = 0.75,
+        escalation_factor: float = 1.5,
+        max_escalations: int = 1,
+    ):
+        self.enabled = enabled
+        self.default_dpi = default_dpi
+        # Pixels for a page without measurable text; 4 MP is about A4 at 200 dpi
+        self.pixel_budget = pixel_budget
+        # Line pitch to aim for; ~36px keeps Indic matras and conjuncts well resolved
+        self.target_line_px = target_line_px
+        self.min_dpi = min_dpi
+        self.max_dpi = max_dpi
+        # Longest side of the probe render, in pixels
+        self.probe_size = probe_size
+        self.step = max(1, step)
+        # Progressive escalation: pages are first rendered at `first_pass_scale` of the chosen DPI,
+        # and re-rendered `escalation_factor` higher (up to max_dpi) while Vision's confidence is
+        # below `escalate_below`. 0 disables it and renders once at the chosen DPI.
+        self.escalate_below = escalate_below
+        self.first_pass_scale = first_pass_scale
+        self.escalation_factor = escalation_factor
+        self.max_escalations = max(0, max_escalations) if escalate_below > 0 else 0
+
+    def settings(self) -> Dict[str, Any]:
+        """Settings that change the rendered pages; part of the OCR cache keys"""
+        settings: Dict[str, Any] = {"dpi": self.default_dpi}
+        if self.enabled:
+            settings = {
+                "adaptive_dpi": True,
+                "pixel_budget": self.pixel_budget,
+                "target_line_px": self.target_line_px,
+                "min_dpi": self.min_dpi,
+                "max_dpi": self.max_dpi,
+            }
+        if self.max_escalations:
+            settings.update(
+                escalate_below=self.escalate_below,
+                first_pass_scale=self.first_pass_scale,
+                escalation_factor=self.escalation_factor,
+                max_escalations=self.max_escalations,
+            )
+        return settings
+
+    def budget_dpi(self, size_pts: Tuple[float, float], pixels: Optional[int] = None) -> float:
+        """DPI at which a page of this size (in points) uses `pixels` pixels (default: `pixel_budget`)"""
+        area_sq_in = (size_pts[0] / 72) * (size_pts[1] / 72)
+        pixels = pixels or self.pixel_budget
+        return math.sqrt(pixels / area_sq_in) if area_sq_in > 0 else self.default_dpi
+
+    def choose_dpi(self, size_pts: Optional[Tuple[float, float]], probe: Optional[Image.Image]) -> int:
+        """DPI for one page, given its size in points and its probe render (either may be missing)"""
+        if not self.enabled or not size_pts:
+            return self.default_dpi
+
+        dpi = self.budget_dpi(size_pts)
+        pitch = estimate_line_pitch(probe) if probe is not None else None
+        if pitch:
+            # The probe was scaled to fit probe_size, so its resolution follows from the page size
+            probe_dpi = max(probe.size) / (max(size_pts) / 72)
+            dpi = self.target_line_px / (pitch / probe_dpi)
+
+        return self._clamp(dpi)
+
+    def initial_dpi(self, dpi: int) -> int:
+        """DPI for the first OCR attempt at a page planned at `dpi`"""
+        if not self.max_escalations:
+            return dpi
+        return self._clamp(dpi * self.first_pass_scale)
+
+    def next_dpi(self, dpi: int, limit_dpi: Optional[float] = None) -> Optional[int]:
+        """
+        Next escalation step after `dpi`, or None once max_dpi is reached.
+        `limit_dpi` is the highest DPI whose render keeps all its pixels (e.g. under the preprocessor's
+        cap); beyond it a re-render would be scaled back down and sent to Vision again for nothing.
+        """
+        escalated = self._clamp(dpi * self.escalation_factor)
+        if limit_dpi is not None:
+            escalated = min(escalated, int(limit_dpi // self.step * self.step))
+        return escalated if escalated > dpi else None
+
+    def _clamp(self, dpi: float) -> int:
+        dpi = min(max(dpi, self.min_dpi), self.max_dpi)
+        return int(round(dpi / self.step) * self.step)
+
+
+def create_dpi_planner() -> DPIPlanner:
+    """Build the planner from environment settings (VISION_ADAPTIVE_DPI=false renders at VISION_DPI)"""
+    return DPIPlanner(
+        enabled=os.getenv("VISION_ADAPTIVE_DPI", "true").lower() in ("1", "true", "yes"),
+        default_dpi=int(os.getenv("VISION_DPI", "200")),
+        pixel_budget=int(os.getenv("VISION_PIXEL_BUDGET", "4000000")),
+        min_dpi=int(os.getenv("VISION_MIN_DPI", "100")),
+        max_dpi=int(os.getenv("VISION_MAX_DPI", "400")),
+        escalate_below=float(os.getenv("VISION_ESCALATE_BELOW_CONFIDENCE", "0.75")),
+        first_pass_scale=float(os.getenv("VISION_FIRST_PASS_DPI_SCALE", "0.75")),
+    )
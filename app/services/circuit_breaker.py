@@ -0,0 +1,168 @@
+"""
+Circuit Breaker
+Stops sending work to Vision while it is failing. Once the error rate over a
+rolling window crosses a threshold the breaker opens and calls fail at once
+instead of each waiting for its own timeout; after a cool-off a few probe
+calls are let through (half-open) to decide whether to close again.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of making a call while the breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker.
+    Closed: calls pass; outcomes are kept for `window_seconds`. When at least `min_calls` were made
+    and the failed share reaches `failure_rate`, the breaker opens.
+    Open: calls raise CircuitOpenError for `open_seconds`, then the breaker half-opens.
+    Half-open: up to `probes` calls at a time are let through; `probes` successes close the breaker,
+    any failure opens it again.
+    `is_failure` decides which exceptions count against the service (others count as successes).
+    """
+
+    def __init__(
+        self,
+        name: str = "vision",
+        failure_rate: float = 0.5,
+        min_calls: int = 20,
+        window_seconds: float = 30.0,
+        open_seconds: float = 30.0,
+        probes: int = 3,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, min_calls)
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.probes = max(1, probes)
+        self.is_failure = is_failure or (lambda e: True)
+
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (time, failed)
+        self._failures_in_window = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._trips = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        probe = self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._after_call(probe, failed=isinstance(e, Exception) and self.is_failure(e))
+            raise
+        self._after_call(probe, failed=False)
+        return result
+
+    def _before_call(self) -> bool:
+        """Admit or reject a call; returns True if it is a half-open probe"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == STATE_CLOSED:
+                return False
+            if self._state == STATE_HALF_OPEN and self._probes_in_flight < self.probes:
+                self._probes_in_flight += 1
+                return True
+            self._rejected += 1
+            raise CircuitOpenError(f"{self.name} circuit is {self._state}; failing fast")
+
+    def _after_call(self, probe: bool, failed: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                self._probes_in_flight -= 1
+                if self._state != STATE_HALF_OPEN:
+                    return
+                if failed:
+                    self._open(now, "probe failed")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self._state = STATE_CLOSED
+                    self._outcomes.clear()
+                    self._failures_in_window = 0
+                    logger.info(f"✓ {self.name} circuit closed")
+                return
+
+            if self._state != STATE_CLOSED:
+                return  # A call admitted before the breaker opened
+            self._outcomes.append((now, failed))
+            self._failures_in_window += failed
+            self._prune(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures_in_window / calls >= self.failure_rate:
+                self._open(now, f"{self._failures_in_window}/{calls} calls failed in {self.window_seconds:g}s")
+
+    def _open(self, now: float, reason: str) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = now
+        self._trips += 1
+        logger.error(f"✗ {self.name} circuit opened ({reason}); failing fast for {self.open_seconds:g}s")
+
+    def _refresh_state(self) -> None:
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = STATE_HALF_OPEN
+            self._probe_successes = 0
+            logger.info(f"{self.name} circuit half-open, sending probe requests")
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            _, failed = self._outcomes.popleft()
+            self._failures_in_window -= failed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_state()
+            self._prune(time.monotonic())
+            calls = len(self._outcomes)
+            return {
+                "state": self._state,
+                "window_calls": calls,
+                "window_failure_rate": round(self._failures_in_window / calls, 3) if calls else 0.0,
+                "failure_rate_threshold": self.failure_rate,
+                "trips": self._trips,
+                "rejected": self._rejected,
+                "open_for_seconds": (
+                    round(time.monotonic() - self._opened_at, 1) if self._state != STATE_CLOSED else 0.0
+                ),
+            }
+
+
+def create_circuit_breaker(is_failure: Optional[Callable[[BaseException], bool]] = None) -> Optional[CircuitBreaker]:
+    """Build the Vision breaker from environment settings; VISION_BREAKER_ENABLED=false disables it"""
+    if os.getenv("VISION_BREAKER_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    return CircuitBreaker(
+        failure_rate=float(os.getenv("VISION_BREAKER_FAILURE_RATE", "0.5")),
+        min_calls=int(os.getenv("VISION_BREAKER_MIN_CALLS", "20")),
+        window_seconds=float(os.getenv("VISION_BREAKER_WINDOW_SECONDS", "30")),
+        open_seconds=float(os.getenv("VISION_BREAKER_OPEN_SECONDS", "30")),
+        probes=int(os.getenv("VISION_BREAKER_PROBES", "3")),
+        is_failure=is_failure,
+    )
@@ -9,15 +9,180 @@ import time
 import subprocess
 import shutil
 import tempfile
-from typing import Optional, List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import queue
+import functools
+import itertools
+from collections import deque
+from typing import Any, Optional, List, Tuple, Callable, Dict, Hashable, Iterable, Iterator, Generator, TypeVar
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 
-import pdfplumber
-from pdf2image import convert_from_bytes, convert_from_path
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_path
 from google.cloud import vision
 
+from app.services.ocr_cache import OCRResultCache, create_result_cache, hash_file, make_cache_key
+from app.services.ocr_checkpoints import OCRCheckpointStore, create_checkpoint_store
+from app.services.pdf_extraction import PDFTextExtractor, create_text_extractor
+from app.services.text_quality import is_text_quality_good, sample_pages
+from app.services.image_preprocessing import ImagePreprocessor, create_image_preprocessor
+from app.services.adaptive_dpi import DPIPlanner, create_dpi_planner, parse_page_sizes
+from app.services.vision_retry import OCRCancelled, RetryPolicy, VisionResponseError, create_retry_policy, is_transient
+from app.services.vision_hedging import RequestHedger, create_request_hedger
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, create_circuit_breaker
+from app.services.local_ocr import TesseractEngine, create_fallback_engine
+from app.services.vision_pool import (
+    OVERLOAD_STATUS_CODES, OCRWorkerPool, VisionCallLimiter, create_call_limiter, create_worker_pool
+)
+
 logger = logging.getLogger(__name__)
 
+# Called as progress_callback(pages_done, pages_total) while a document is processed
+ProgressCallback = Callable[[int, int], None]
+
+# Recognized text of a page and Vision's confidence in it (None when there is no text)
+ScoredText = Tuple[str, Optional[float]]
+
+# A unit of batch OCR work: (fn, args, page count, on_done(result)); see VisionService._run_batch_tasks
+BatchTask = Tuple[Callable[..., Dict], Tuple, int, Callable[[Dict], None]]
+
+T = TypeVar("T")
+
+# Stands in for the text of pages that could not be recognized
+PAGE_FAILED_MARKER = "[OCR failed for this page]"
+
+# How scanned PDF pages are sent to Vision:
+#   "raster": render pages locally with poppler and upload one JPEG per page
+#   "files":  send inline PDF sub-documents to batch_annotate_files (no local rendering)
+PDF_ENGINE_RASTER = "raster"
+PDF_ENGINE_FILES = "files"
+
+# batch_annotate_files accepts at most 5 pages per inline file request
+FILES_MAX_PAGES_PER_REQUEST = 5
+
+# batch_annotate_images accepts at most 16 images per request, and the JSON request
+# (with base64-encoded images, ~4/3 of the raw size) must stay under ~10 MB
+IMAGES_MAX_PER_REQUEST = 16
+IMAGES_MAX_BYTES_PER_REQUEST = 7 * 1024 * 1024
+
+# Page cache namespaces: text-layer pages don't depend on any OCR setting
+PAGE_SOURCE_TEXT_LAYER = "text_layer"
+PAGE_SOURCE_VISION = "vision"
+
+
+class OCRContext:
+    """Per-request state threaded through the OCR pipeline"""
+
+    def __init__(
+        self,
+        progress_callback: Optional[ProgressCallback] = None,
+        doc_hash: Optional[str] = None,
+        deadline: Optional[float] = None,
+        cancel_event: Optional[threading.Event] = None,
+        flow: Optional[Hashable] = None,
+    ):
+        self.progress_callback = progress_callback
+        # SHA-256 of the document; set when caching is enabled
+        self.doc_hash = doc_hash
+        # time.monotonic() by which the whole request must finish, if limited
+        self.deadline = deadline
+        # Set once any page was recognized by the local fallback engine instead of Vision
+        self.degraded = False
+        # Set by the caller when the result is no longer wanted (e.g. the HTTP client went away)
+        self.cancel_event = cancel_event or threading.Event()
+        # Whose share of the worker pool this request's pages use (the user; else just this request)
+        self.flow = flow if flow is not None else self
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        """True once the request deadline has passed"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise OCRCancelled("OCR request cancelled")
+
+    def page_deadline(self, page_timeout: float) -> float:
+        """Deadline for a page (or batch of pages) starting now, capped by the request deadline"""
+        deadline = time.monotonic() + page_timeout
+        return min(deadline, self.deadline) if self.deadline else deadline
+
+    def report_progress(self, pages_done: int, pages_total: int) -> None:
+        if self.progress_callback:
+            self.progress_callback(pages_done, pages_total)
+
+
+class SpeculativeOCR:
+    """
+    Phase 2 OCR started before the Phase 1 verdict is in (speculative mode).
+    The page iterator runs on its own thread with its own cancel event, so the request can
+    cancel a losing run (and its in-flight batches) without cancelling itself.
+    """
+
+    def __init__(self, start: Callable[[OCRContext], Iterator[Tuple[int, Optional[str]]]], ctx: OCRContext):
+        self.ctx = ctx
+        self.run_ctx = OCRContext(doc_hash=ctx.doc_hash, deadline=ctx.deadline, flow=ctx.flow)
+        # Delivered pages, then an exception if the run failed, then None
+        self._results: queue.Queue = queue.Queue()
+        self._pages = start(self.run_ctx)
+        self.delivered = 0
+        self.failed = False
+        self._thread = threading.Thread(target=self._pump, name="pdf-speculative", daemon=True)
+        self._thread.start()
+
+    def _pump(self) -> None:
+        try:
+            for item in self._pages:
+                self.delivered += 1
+                self._results.put(item)
+        except Exception as e:
+            if not self.run_ctx.cancelled:
+                logger.warning(f"Speculative OCR failed: {e}")
+                self.failed = True
+            self._results.put(e)
+        finally:
+            self._results.put(None)
+
+    def _sync_degraded(self) -> None:
+        if self.run_ctx.degraded:
+            self.ctx.degraded = True
+
+    def stop(self) -> List[Tuple[int, Optional[str]]]:
+        """Cancel the run, wait for its in-flight batches to wind down, and return the pages it delivered"""
+        self.run_ctx.cancel_event.set()
+        self._thread.join()
+        self._sync_degraded()
+        pages = []
+        while True:
+            item = self._results.get_nowait()
+            if item is None:
+                return pages
+            if isinstance(item, tuple):
+                pages.append(item)
+
+    def pages(self) -> Iterator[Tuple[int, Optional[str]]]:
+        """The run's pages in order as they come in; cancelling the request or closing this stops the run"""
+        try:
+            while True:
+                self.ctx.check_cancelled()
+                try:
+                    item = self._results.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                self._sync_degraded()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.run_ctx.cancel_event.set()
+            self._thread.join()
+
+
 class VisionService:
     """
     Advanced OCR Service for handling both images and PDFs efficiently.
@@ -25,10 +190,70 @@ class VisionService:
     Image-based OCR for scanned PDFs.
     """
 
-    def __init__(self, vision_client: vision.ImageAnnotatorClient):
+    def __init__(
+        self,
+        vision_client: vision.ImageAnnotatorClient,
+        pdf_engine: str = PDF_ENGINE_RASTER,
+        image_batch_size: int = 4,
+        result_cache: Optional[OCRResultCache] = None,
+        text_extractor: Optional[PDFTextExtractor] = None,
+        speculative: bool = False,
+        preprocessor: Optional[ImagePreprocessor] = None,
+        dpi_planner: Optional[DPIPlanner] = None,
+        worker_pool: Optional[OCRWorkerPool] = None,
+        call_limiter: Optional[VisionCallLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        request_timeout: Optional[float] = None,
+        hedger: Optional[RequestHedger] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        fallback_engine: Optional[TesseractEngine] = None,
+        checkpoints: Optional[OCRCheckpointStore] = None,
+    ):
         """Initialize VisionService with a Vision API client"""
         self.client = vision_client
-        self.max_workers = 8  # Increased for faster Vision API calls
+        self.result_cache = result_cache
+        # Optional: durable per-page progress, so an interrupted document resumes where it stopped
+        self.checkpoints = checkpoints
+        self.text_extractor = text_extractor or PDFTextExtractor()
+        self.preprocessor = preprocessor or ImagePreprocessor()
+        # Rasterization resolution for scanned PDF pages (fixed 200 dpi unless adaptive planning is on)
+        self.dpi_planner = dpi_planner or DPIPlanner(enabled=False)
+        if pdf_engine not in (PDF_ENGINE_RASTER, PDF_ENGINE_FILES):
+            logger.warning(f"Unknown PDF engine '{pdf_engine}', falling back to '{PDF_ENGINE_RASTER}'")
+            pdf_engine = PDF_ENGINE_RASTER
+        self.pdf_engine = pdf_engine
+        # For "auto" mode, we provide a broad set of Indic hints.
+        # Google Vision API is very good at selecting the right one from these,
+        # but providing NO hints often defaults incorrectly for specific scripts like Sanskrit.
+        # Including major scripts: Hindi, Sanskrit, Kannada, Telugu, Tamil, Bengali, Gujarati, Malayalam, Punjabi, Marathi.
+        self.language_hints = ["hi", "sa", "kn", "te", "ta", "bn", "gu", "ml", "pa", "mr", "en"]
+        self.max_workers = 8  # Per-request pipeline depth: OCR tasks (batches / PDF chunks) in flight
+        self.reorder_window = self.max_workers * 2  # Max pages rendered but not yet delivered in order
+        # Threads and Vision RPC slots are shared by all requests (owned by GoogleCloudClient);
+        # a standalone service gets its own
+        self.worker_pool = worker_pool or OCRWorkerPool(max_workers=self.max_workers)
+        self.call_limiter = call_limiter or VisionCallLimiter(limit=self.max_workers)
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Seconds a whole request may take; pages not done by then are marked as failed
+        self.request_timeout = request_timeout
+        # Optional: duplicates Vision calls that run past the usual latency (see vision_hedging)
+        self.hedger = hedger
+        # Optional: fails Vision calls fast while Vision is erroring (owned by GoogleCloudClient),
+        # and a local engine that recognizes images in the meantime
+        self.breaker = breaker
+        self.fallback_engine = fallback_engine
+        self.raster_window = 4  # Pages rendered per poppler call
+        # Rendered pages sent per batch_annotate_images call (1 = one document_text_detection call per page)
+        self.image_batch_size = max(1, min(image_batch_size, IMAGES_MAX_PER_REQUEST))
+        # Phase 1 probe: judge the text layer from a sample of pages before extracting the rest.
+        # If at most `probe_min_good` of the sampled pages pass the quality gate, the document
+        # is treated as scanned and the remaining pages go straight to Vision.
+        self.probe_margin = 0.25  # Sample sized for +/-25% at 95% confidence (<= 16 pages)
+        self.probe_min_good = 0.1
+        # Speculative mode: start Phase 2 on the whole range while Phase 1 is still running,
+        # then cancel whichever turns out not to be needed. Costs Vision calls on pages that
+        # end up served from the text layer, so it is opt-in.
+        self.speculative = speculative
 
     def _is_pdf(self, file_bytes: bytes) -> bool:
         """Check if file is PDF by magic bytes"""
@@ -59,252 +284,1301 @@ class VisionService:
             logger.error(f"Error in detect_text: {e}")
             return f"Error detecting text: {str(e)}"
 
-    def detect_text_from_path(self, file_path: str, page_start: Optional[int] = None, page_end: Optional[int] = None) -> str:
+    def detect_text_from_path(
+        self,
+        file_path: str,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        flow: Optional[Hashable] = None,
+        raise_errors: bool = False,
+    ) -> str:
         """
         Detect and extract text from image or PDF file path with automatic language detection.
+        If given, progress_callback(pages_done, pages_total) is invoked as pages finish.
+        Setting cancel_event stops the pipeline and raises OCRCancelled.
+        Pages are scheduled fairly between flows (pass the user ID; default: one flow per request).
+        Complete results are stored in the result cache, and repeat requests are served from it.
+        Errors are returned as text unless raise_errors is set; then they raise, as does a
+        result in which no page could be recognized.
         """
         try:
             if not os.path.exists(file_path):
+                if raise_errors:
+                    raise FileNotFoundError(f"File not found: {file_path}")
                 logger.error(f"File not found: {file_path}")
                 return ""
 
-            # Check if PDF by extension or magic bytes
-            is_pdf = file_path.lower().endswith('.pdf')
-            if not is_pdf:
-                with open(file_path, 'rb') as f:
-                    header = f.read(4)
-                    is_pdf = header.startswith(b'%PDF')
+            is_pdf = self._is_pdf_path(file_path)
+            ctx = self._new_context(file_path, progress_callback, cancel_event, flow)
+            ctx.check_cancelled()
+
+            cache_key = None
+            if self.result_cache:
+                cache_key = self._result_cache_key(ctx.doc_hash, is_pdf, page_start, page_end)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info("✓ OCR result served from cache")
+                    return cached
 
             if is_pdf:
                 logger.info("PDF detected - Starting memory-optimized hybrid OCR pipeline (auto-lang)")
-                return self._extract_text_from_pdf_hybrid(file_path, page_start=page_start, page_end=page_end)
+                text, complete = self._extract_text_from_pdf_hybrid(
+                    file_path, page_start, page_end, ctx, raise_errors=raise_errors
+                )
             else:
                 logger.info("Image detected - Starting Vision API OCR (auto-lang)")
-                with open(file_path, 'rb') as f:
-                    return self._extract_text_from_image(f.read())
+                try:
+                    text = self._extract_text_from_image(
+                        self._read_image_for_upload(file_path),
+                        deadline=ctx.page_deadline(self.retry_policy.page_timeout),
+                        ctx=ctx,
+                    )
+                    complete = True
+                except OCRCancelled:
+                    raise
+                except Exception as e:
+                    if raise_errors:
+                        raise
+                    logger.error(f"Error extracting from image: {e}")
+                    text, complete = PAGE_FAILED_MARKER, False
+                ctx.report_progress(1, 1)
+
+            # Never cache partial or fallback results, so those pages go to Vision next time
+            if cache_key and complete and not ctx.degraded:
+                self.result_cache.put(cache_key, text)
+            return text
             
+        except OCRCancelled:
+            logger.info("OCR cancelled")
+            raise
         except Exception as e:
             logger.error(f"Error in detect_text_from_path: {e}")
+            if raise_errors:
+                raise
             return f"Error detecting text: {str(e)}"
 
-    def _extract_text_from_image(self, file_bytes: bytes) -> str:
-        """Extract text from image using Google Vision API with robust automatic detection"""
+    def iter_text_from_path(
+        self,
+        file_path: str,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        flow: Optional[Hashable] = None,
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Streaming variant of detect_text_from_path.
+        Yields (page_num, chunk) in page order as soon as each page is ready, where
+        chunk is formatted as in the full output ("--- Page N ---" plus text for PDFs),
+        so joining the chunks with blank lines reproduces detect_text_from_path.
+        Errors are raised instead of being returned as text.
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        ctx = self._new_context(file_path, progress_callback, cancel_event, flow)
+        ctx.check_cancelled()
+        if self._is_pdf_path(file_path):
+            logger.info("PDF detected - Starting streaming hybrid OCR pipeline (auto-lang)")
+            for num, text in self._iter_pdf_pages_hybrid(file_path, page_start, page_end, ctx):
+                # Blank pages are skipped; failed pages (None) come out marked
+                if text != "":
+                    yield num, self._format_pages([(num, text)])
+        else:
+            logger.info("Image detected - Starting Vision API OCR (auto-lang)")
+            text = self._extract_text_from_image(
+                self._read_image_for_upload(file_path),
+                deadline=ctx.page_deadline(self.retry_policy.page_timeout),
+                ctx=ctx,
+            )
+            if progress_callback:
+                progress_callback(1, 1)
+            if text:
+                yield 1, text
+
+    def detect_text_batch(
+        self,
+        file_paths: List[str],
+        cancel_event: Optional[threading.Event] = None,
+        flow: Optional[Hashable] = None,
+    ) -> List[str]:
+        """
+        OCR several files as one job and return the text of each, in order, as detect_text_from_path would.
+        Images from all files are pooled into shared batch_annotate_images calls, and the Vision pages
+        of all PDFs are cut into runs; both are fed to the shared worker pool from one scheduling loop
+        (see _run_batch_tasks), so a folder takes roughly as long as its slowest page rather than the
+        sum of its documents.
+        """
+        pdf_set = {idx for idx, path in enumerate(file_paths) if self._is_pdf_path(path)}
+        images = [(idx, path) for idx, path in enumerate(file_paths) if idx not in pdf_set]
+        pdfs = [(idx, path) for idx, path in enumerate(file_paths) if idx in pdf_set]
+        logger.info(f"Batch OCR: {len(images)} images and {len(pdfs)} PDFs")
+
+        # All files of the batch share one flow, so a big batch gets one share of the pool
+        ctx = OCRContext(
+            deadline=time.monotonic() + self.request_timeout if self.request_timeout else None,
+            cancel_event=cancel_event,
+            flow=flow if flow is not None else object(),
+        )
+        results: List[str] = [""] * len(file_paths)
+        temp_dir = tempfile.mkdtemp(prefix="ocr-batch-")
         try:
-            image = vision.Image(content=file_bytes)
-            
-            # For "auto" mode, we provide a broad set of Indic hints.
-            # Google Vision API is very good at selecting the right one from these,
-            # but providing NO hints often defaults incorrectly for specific scripts like Sanskrit.
-            # Including major scripts: Hindi, Sanskrit, Kannada, Telugu, Tamil, Bengali, Gujarati, Malayalam, Punjabi, Marathi.
-            language_hints = ["hi", "sa", "kn", "te", "ta", "bn", "gu", "ml", "pa", "mr", "en"]
-            context = vision.ImageContext(language_hints=language_hints)
-            
-            response = self.client.document_text_detection(image=image, image_context=context)
-            
-            if response.error.message:
-                logger.error(f"Vision API error: {response.error.message}")
-                return ""
-            
-            return response.full_text_annotation.text if response.full_text_annotation else ""
+            tasks = itertools.chain(
+                self._image_file_tasks(images, results, ctx),
+                *(self._pdf_file_tasks(path, ctx, temp_dir, functools.partial(results.__setitem__, idx))
+                  for idx, path in pdfs),
+            )
+            self._run_batch_tasks(tasks, ctx)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return results
+
+    def _run_batch_tasks(self, tasks: Iterator[BatchTask], ctx: OCRContext) -> None:
+        """
+        Run (fn, args, pages, on_done) tasks on the shared worker pool from one loop, keeping at most
+        `max_workers` in flight. on_done gets the task's result, or {} if it failed or was never sent
+        because the request deadline had passed. Tasks are pulled lazily, so a PDF's text layer is only
+        read once its pages are about to be scheduled.
+        """
+        in_flight: Dict[Future, Callable[[Dict], None]] = {}
+        exhausted = False
+        skipped = 0
+        try:
+            while True:
+                ctx.check_cancelled()
+                while not exhausted and len(in_flight) < self.max_workers:
+                    task = next(tasks, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    fn, args, pages, on_done = task
+                    if ctx.expired:
+                        skipped += pages
+                        on_done({})
+                        continue
+                    in_flight[self.worker_pool.submit(fn, *args, flow=ctx.flow, cost=pages)] = on_done
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_done = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Batch OCR task failed: {e}")
+                        result = {}
+                    on_done(result)
+        finally:
+            # Cancel queued work and let running tasks finish before the temp dir is removed
+            dropped = sum(future.cancel() for future in in_flight)
+            if ctx.cancelled:
+                logger.info(f"Batch OCR cancelled, {dropped} queued tasks dropped")
+            wait(in_flight)
+        if skipped:
+            logger.warning(f"Request deadline reached: {skipped} pages not sent to Vision")
+
+    def _image_file_tasks(
+        self, images: List[Tuple[int, str]], results: List[str], ctx: OCRContext
+    ) -> Iterator[BatchTask]:
+        """
+        Batch tasks for standalone image files, writing each image's text into results[idx].
+        Each image is cached like a single-image request; images that fail get PAGE_FAILED_MARKER.
+        """
+        keys: Dict[int, str] = {}
+        served = set()
+        if self.result_cache and images:
+            keys = {idx: self._result_cache_key(hash_file(path), False, None, None) for idx, path in images}
+            cached = self.result_cache.get_many(list(keys.values()))
+            for idx, key in keys.items():
+                if key in cached:
+                    results[idx] = cached[key]
+                    served.add(idx)
+            if served:
+                logger.info(f"✓ {len(served)} of {len(images)} images served from cache")
+
+        def deliver(batch: List[Tuple[int, str]], batch_results: Dict[int, Optional[ScoredText]]) -> None:
+            for idx, _ in batch:
+                result = batch_results.get(idx)
+                if result is None:
+                    results[idx] = PAGE_FAILED_MARKER
+                    continue
+                results[idx] = result[0]
+                if idx in keys and not ctx.degraded:
+                    self.result_cache.put(keys[idx], result[0])
+
+        for batch in self._group_image_batches([(idx, path) for idx, path in images if idx not in served]):
+            yield self._ocr_image_files_batch, (batch, ctx), len(batch), functools.partial(deliver, batch)
+
+    def _pdf_file_tasks(
+        self, pdf_path: str, batch_ctx: OCRContext, temp_dir: str, deliver: Callable[[str], None]
+    ) -> Iterator[BatchTask]:
+        """
+        Batch tasks for one PDF of a batch: the hybrid strategy of detect_text_from_path, with the
+        Phase 2 pages cut into runs (raster engine) or chunks (files engine) for _run_batch_tasks.
+        deliver(text) is called once the document's last page is in.
+        """
+        ctx = OCRContext(
+            doc_hash=hash_file(pdf_path) if self.result_cache or self.checkpoints else None,
+            deadline=batch_ctx.deadline,
+            cancel_event=batch_ctx.cancel_event,
+            flow=batch_ctx.flow,
+        )
+        try:
+            cache_key = self._result_cache_key(ctx.doc_hash, True, None, None) if self.result_cache else None
+            cached = self.result_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                deliver(cached)
+                return
+
+            page_nums = self._resolve_page_range(pdf_path, None, None)
+            texts: Dict[int, Optional[str]] = dict(self._extract_good_text_layer_pages(pdf_path, page_nums, ctx))
+            bad = [num for num in page_nums if num not in texts]
+            texts.update(self._get_cached_pages(ctx, bad, PAGE_SOURCE_VISION))
+            texts.update(self._load_checkpoint(ctx, [num for num in bad if num not in texts]))
+        except OCRCancelled:
+            raise
         except Exception as e:
-            logger.error(f"Error extracting from image: {e}")
-            return ""
+            logger.error(f"Error in hybrid OCR of {pdf_path}: {e}", exc_info=True)
+            deliver(f"[Error processing document: {str(e)}]")
+            return
+        missing = [num for num in page_nums if num not in texts]
+        logger.info(f"Batch PDF: {len(page_nums)} pages, {len(missing)} to OCR")
+
+        def finish() -> None:
+            pages = [(num, texts.get(num)) for num in page_nums]
+            failed = [num for num, text in pages if text is None]
+            text = self._format_pages(pages)
+            if failed:
+                logger.warning(f"OCR failed for {len(failed)} page(s) of {pdf_path}: {failed}")
+            elif not ctx.degraded:
+                self._discard_checkpoint(ctx, bad)
+                if cache_key:
+                    self.result_cache.put(cache_key, text)
+            deliver(text)
+
+        if self.pdf_engine == PDF_ENGINE_FILES:
+            fn = self._ocr_pdf_chunk
+            units = [missing[i:i + FILES_MAX_PAGES_PER_REQUEST] for i in range(0, len(missing), FILES_MAX_PAGES_PER_REQUEST)]
+        else:
+            fn = functools.partial(self._ocr_pdf_run, temp_dir=temp_dir)
+            units = [list(range(first, last + 1)) for first, last in self._page_runs(missing, self.image_batch_size)]
+        remaining = len(units)
+        if not remaining:
+            finish()
+            return
+
+        def on_done(pages: List[int], run_texts: Dict[int, Optional[str]]) -> None:
+            nonlocal remaining
+            for num in pages:
+                texts[num] = run_texts.get(num)
+                if texts[num] is not None:
+                    self._cache_page(ctx, num, PAGE_SOURCE_VISION, texts[num])
+            remaining -= 1
+            if not remaining:
+                finish()
+
+        for pages in units:
+            yield fn, (pdf_path, pages, ctx), len(pages), functools.partial(on_done, pages)
+
+    def _ocr_pdf_run(self, pdf_path: str, pages: List[int], ctx: OCRContext, temp_dir: str) -> Dict[int, Optional[str]]:
+        """Batch task: render a run of consecutive pages at their planned DPIs and OCR them"""
+        if ctx.cancelled or ctx.expired:
+            return {}
+        dpis = {
+            num: self.dpi_planner.initial_dpi(dpi)
+            for num, dpi in self._plan_page_dpis(pdf_path, pages[0], pages[-1]).items()
+        }
+        texts: Dict[int, Optional[str]] = {}
+        for run_start, run_end, dpi in self._dpi_runs(pages[0], pages[-1], dpis):
+            paths = self._render_pages(pdf_path, run_start, run_end, dpi, temp_dir)
+            for batch in self._group_image_batches(list(zip(range(run_start, run_end + 1), paths))):
+                texts.update(self._ocr_image_batch_and_discard(batch, pdf_path, dpi, temp_dir, ctx))
+        return texts
+
+    def _ocr_image_files_batch(self, batch: List[Tuple[int, str]], ctx: OCRContext) -> Dict[int, Optional[ScoredText]]:
+        """Batch task for standalone images; the page deadline starts when a worker picks the batch up"""
+        if ctx.cancelled:
+            return {}
+        return self._ocr_image_batch(batch, ctx.page_deadline(self.retry_policy.page_timeout), ctx, rendered=False)
+
+    def _new_context(
+        self,
+        file_path: str,
+        progress_callback: Optional[ProgressCallback],
+        cancel_event: Optional[threading.Event] = None,
+        flow: Optional[Hashable] = None,
+    ) -> OCRContext:
+        """Build the per-request context; the document is hashed only when caching or checkpoints are enabled"""
+        doc_hash = hash_file(file_path) if self.result_cache or self.checkpoints else None
+        deadline = time.monotonic() + self.request_timeout if self.request_timeout else None
+        return OCRContext(
+            progress_callback=progress_callback,
+            doc_hash=doc_hash,
+            deadline=deadline,
+            cancel_event=cancel_event,
+            flow=flow,
+        )
+
+    def _result_cache_key(self, doc_hash: str, is_pdf: bool, page_start: Optional[int], page_end: Optional[int]) -> str:
+        """Cache key covering the file contents and every setting that changes the output"""
+        settings = {"language_hints": self.language_hints, **self.preprocessor.settings()}
+        if is_pdf:
+            settings.update(page_start=page_start, page_end=page_end, pdf_engine=self.pdf_engine)
+            settings.update(self.dpi_planner.settings())
+        return make_cache_key(doc_hash, **settings)
+
+    def _page_cache_key(self, doc_hash: str, page_num: int, source: str) -> str:
+        """Cache key for a single page; Vision pages also depend on the OCR settings"""
+        settings = {"page": page_num, "source": source}
+        if source == PAGE_SOURCE_VISION:
+            settings.update(self._vision_page_settings())
+        return make_cache_key(doc_hash, **settings)
+
+    def _vision_page_settings(self) -> Dict[str, Any]:
+        """Settings that change the Vision text of a PDF page"""
+        settings: Dict[str, Any] = {"language_hints": self.language_hints, "pdf_engine": self.pdf_engine}
+        settings.update(self.dpi_planner.settings())
+        if self.pdf_engine == PDF_ENGINE_RASTER:
+            settings.update(self.preprocessor.settings())
+        return settings
+
+    def _checkpoint_key(self, ctx: OCRContext) -> Optional[str]:
+        if not self.checkpoints or not ctx.doc_hash:
+            return None
+        return make_cache_key(ctx.doc_hash, checkpoint=True, **self._vision_page_settings())
+
+    def _load_checkpoint(self, ctx: OCRContext, pages: List[int]) -> Dict[int, str]:
+        """Return the subset of `pages` recognized by an earlier, unfinished run of this document"""
+        key = self._checkpoint_key(ctx)
+        return self.checkpoints.load(key, pages) if key else {}
+
+    def _checkpoint_pages(self, ctx: OCRContext, texts: Dict[int, Optional[str]]) -> None:
+        """Persist the recognized pages of a finished OCR task (failed pages are left for the next run)"""
+        key = self._checkpoint_key(ctx)
+        # Fallback-engine text is not kept, for the same reason it isn't cached
+        if key and not ctx.degraded:
+            self.checkpoints.save(key, {num: text for num, text in texts.items() if text is not None})
+
+    def _discard_checkpoint(self, ctx: OCRContext, pages: List[int]) -> None:
+        """Drop delivered pages from the checkpoint; other pages may belong to another run or range"""
+        key = self._checkpoint_key(ctx)
+        if key:
+            self.checkpoints.discard(key, pages)
+
+    def _get_cached_pages(self, ctx: OCRContext, pages: List[int], source: str) -> Dict[int, str]:
+        """Return the subset of `pages` already in the page cache"""
+        if not self.result_cache or not ctx.doc_hash:
+            return {}
+        keys = {self._page_cache_key(ctx.doc_hash, num, source): num for num in pages}
+        return {keys[key]: text for key, text in self.result_cache.get_many(list(keys)).items()}
+
+    def _cache_page(self, ctx: OCRContext, page_num: int, source: str, text: str) -> None:
+        if source == PAGE_SOURCE_VISION and ctx.degraded:
+            return  # Can't tell which pages came from the fallback engine; keep them all out of the cache
+        if self.result_cache and ctx.doc_hash:
+            self.result_cache.put(self._page_cache_key(ctx.doc_hash, page_num, source), text)
+
+    def _is_pdf_path(self, file_path: str) -> bool:
+        """Check if file is PDF by extension or magic bytes"""
+        if file_path.lower().endswith('.pdf'):
+            return True
+        with open(file_path, 'rb') as f:
+            return self._is_pdf(f.read(4))
+
+    @staticmethod
+    def _format_pages(pages: Iterable[Tuple[int, Optional[str]]]) -> str:
+        """
+        Join (page_num, text) pairs into the page-delimited output format, skipping empty pages.
+        Pages that failed (text None) are kept with PAGE_FAILED_MARKER so they don't silently vanish.
+        """
+        return "\n\n".join(
+            f"--- Page {num} ---\n{PAGE_FAILED_MARKER if text is None else text}"
+            for num, text in pages if text != ""
+        )
+
+    def _read_image_for_upload(self, img_path: str, rendered: bool = False) -> bytes:
+        """Read an image file and run it through the preprocessing stage (`rendered`: a PDF page render)"""
+        with open(img_path, 'rb') as f:
+            return self.preprocessor.process(f.read(), rendered=rendered)
+
+    def _extract_text_from_image(
+        self, file_bytes: bytes, deadline: Optional[float] = None, ctx: Optional[OCRContext] = None
+    ) -> str:
+        """
+        Extract text from image using Google Vision API with robust automatic detection.
+        Raises on API errors so callers can tell a failed page from a blank one.
+        """
+        return self._recognize_image(file_bytes, deadline, ctx)[0]
+
+    def _recognize_image(
+        self, file_bytes: bytes, deadline: Optional[float] = None, ctx: Optional[OCRContext] = None
+    ) -> ScoredText:
+        """
+        OCR one image with Vision, or with the local fallback engine while the Vision circuit is open.
+        Fallback text has no confidence and marks the request as degraded.
+        """
+        try:
+            return self._scored_text_from_response(self._annotate_image(file_bytes, deadline, ctx))
+        except CircuitOpenError:
+            if not self.fallback_engine:
+                raise
+        if ctx:
+            ctx.degraded = True
+        return self.fallback_engine.recognize(file_bytes), None
+
+    def _annotate_image(
+        self, file_bytes: bytes, deadline: Optional[float] = None, ctx: Optional[OCRContext] = None
+    ) -> vision.AnnotateImageResponse:
+        """
+        Run document_text_detection on one image, retrying transient failures until `deadline`.
+        Raises on permanent API errors.
+        """
+        image = vision.Image(content=file_bytes)
+        context = vision.ImageContext(language_hints=self.language_hints)
+
+        def attempt(timeout: float) -> vision.AnnotateImageResponse:
+            with self._vision_slot(1, deadline, ctx):
+                response = self.client.document_text_detection(
+                    image=image, image_context=context, retry=None, timeout=self._rpc_timeout(timeout, deadline)
+                )
+            self._raise_for_response_error(response)
+            return response
+
+        return self._call_vision("document_text_detection", attempt, deadline, ctx=ctx)
+
+    def _call_vision(
+        self,
+        what: str,
+        attempt: Callable[[float], T],
+        deadline: Optional[float],
+        size: int = 1,
+        ctx: Optional[OCRContext] = None,
+    ) -> T:
+        """
+        Run one Vision call through the retry policy, hedging each attempt when enabled.
+        Every RPC (hedges included) passes the circuit breaker, which raises CircuitOpenError
+        instead of calling Vision while the circuit is open; that error is not retried.
+        No retry is started once the request is cancelled.
+        """
+        cancel_event = ctx.cancel_event if ctx else None
+        if self.breaker:
+            rpc = attempt
+            attempt = lambda timeout: self.breaker.call(rpc, timeout)
+        if self.hedger:
+            key = f"{what}/{size}"
+            hedged = lambda timeout: self.hedger.call(key, attempt, timeout)
+            return self.retry_policy.call(hedged, deadline, what=what, cancel_event=cancel_event)
+        return self.retry_policy.call(attempt, deadline, what=what, cancel_event=cancel_event)
+
+    def _vision_slot(self, weight: int, deadline: Optional[float], ctx: Optional[OCRContext]):
+        """A call limiter slot that stops waiting once the page deadline passes or the request is cancelled"""
+        return self.call_limiter.slot(
+            weight,
+            ctx.flow if ctx else None,
+            deadline=deadline,
+            cancel_event=ctx.cancel_event if ctx else None,
+        )
+
+    @staticmethod
+    def _rpc_timeout(timeout: float, deadline: Optional[float]) -> float:
+        """RPC timeout once a slot is granted: the attempt's timeout, capped by what is left of `deadline`"""
+        if deadline is None:
+            return timeout
+        return min(timeout, max(0.001, deadline - time.monotonic()))
+
+    def _raise_for_response_error(self, response) -> None:
+        """Turn an error embedded in a Vision response into VisionResponseError"""
+        if response.error.message:
+            if response.error.code in OVERLOAD_STATUS_CODES:
+                self.call_limiter.record_overload()
+            raise VisionResponseError(response.error.message, response.error.code)
+
+    @staticmethod
+    def _text_from_response(response) -> str:
+        """Full text of an AnnotateImageResponse, or "" if nothing was detected"""
+        return response.full_text_annotation.text if response.full_text_annotation else ""
+
+    @staticmethod
+    def _confidence_from_response(response) -> Optional[float]:
+        """
+        Recognition confidence (0-1) of an AnnotateImageResponse: the page confidence, or the
+        mean block confidence when the page-level value isn't populated. None if there is no text.
+        """
+        annotation = response.full_text_annotation
+        if not annotation or not annotation.pages:
+            return None
+        page_scores = [page.confidence for page in annotation.pages if page.confidence]
+        if page_scores:
+            return sum(page_scores) / len(page_scores)
+        block_scores = [block.confidence for page in annotation.pages for block in page.blocks if block.confidence]
+        return sum(block_scores) / len(block_scores) if block_scores else None
+
+    @classmethod
+    def _scored_text_from_response(cls, response) -> ScoredText:
+        return cls._text_from_response(response), cls._confidence_from_response(response)
 
     def _is_text_quality_good(self, text: str) -> bool:
+        """Evaluate if extracted text is of acceptable quality (see text_quality)"""
+        return is_text_quality_good(text)
+
+    def _extract_text_from_pdf_hybrid(
+        self,
+        pdf_path: str,
+        page_start: Optional[int],
+        page_end: Optional[int],
+        ctx: OCRContext,
+        raise_errors: bool = False,
+    ) -> Tuple[str, bool]:
         """
-        Evaluate if extracted text is of acceptable quality.
-        Detects broken PDF encodings, CID garbage, and encoding artifacts.
+        Hybrid PDF OCR Strategy: Direct extraction first, then Vision API fallback.
+        Returns (text, complete) where complete is False if any page failed.
+        With raise_errors, errors and documents where every page failed raise instead.
         """
-        if not text or len(text.strip()) < 5:
-            return False
-            
-        total_len = len(text)
-        
-        # 1. Detect CID-encoded garbage (common in broken PDFs)
-        cid_count = text.count('(cid:')
-        if (cid_count / total_len) * 100 > 1:
-            logger.info(f"Quality Check: Failed due to high CID count ({cid_count})")
-            return False
-        
-        # 2. Detect Encoding Artifacts (Latin-1 Supplement characters used as garbage)
-        # Characters in 128-255 range are rarely valid in this context unless it's specific European text.
-        # In Indic PDF extraction, these are almost always garbage mapping artifacts.
-        extended_latin_count = 0
-        indic_char_count = 0
-        control_chars = 0
-        
-        for char in text:
-            cp = ord(char)
-            # Control characters
-            if cp < 32 and char not in '\n\r\t ':
-                control_chars += 1
-            # Latin-1 Supplement / Extended ASCII (Broken mappings often end up here)
-            elif 128 <= cp <= 255:
-                extended_latin_count += 1
-            # Standard Indic Unicode Blocks (Devanagari to Malayalam / Sinhala)
-            elif 0x0900 <= cp <= 0x0DFF:
-                indic_char_count += 1
-        
-        # High extended latin count is the primary indicator of the "pathetic" OCR the user reported
-        if (extended_latin_count / total_len) * 100 > 2:
-            logger.info(f"Quality Check: Failed due to high extended latin count ({extended_latin_count})")
-            return False
-            
-        if (control_chars / total_len) * 100 > 2:
-            logger.info(f"Quality Check: Failed due to high control character count")
-            return False
-            
-        # 3. Script Coherence Check
-        # If the text has a lot of "weird" characters but NO Indic characters, 
-        # it's likely a broken mapping of an Indic script.
-        # (Assuming the app is used for Indic docs)
-        words = text.split()
-        if not words: return False
+        try:
+            pages = list(self._iter_pdf_pages_hybrid(pdf_path, page_start, page_end, ctx))
+        except OCRCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Error in hybrid OCR: {e}", exc_info=True)
+            if raise_errors:
+                raise
+            return f"[Error processing document: {str(e)}]", False
+
+        failed = [num for num, text in pages if text is None]
+        if failed:
+            logger.warning(f"OCR failed for {len(failed)} page(s): {failed}")
+            if raise_errors and len(failed) == len(pages):
+                raise RuntimeError(f"OCR failed for all {len(pages)} page(s)")
+        return self._format_pages(pages), not failed
+
+    def _iter_pdf_pages_hybrid(
+        self,
+        pdf_path: str,
+        page_start: Optional[int],
+        page_end: Optional[int],
+        ctx: OCRContext,
+    ) -> Iterator[Tuple[int, Optional[str]]]:
+        """
+        Yield (page_num, text) for the hybrid strategy in page order; text is None for failed pages.
+        The quality gate runs per page: pages with a usable text layer keep it, and only the
+        rest are sent to Vision, so a few scanned plates don't force the whole range through OCR.
+        """
+        page_nums = self._resolve_page_range(pdf_path, page_start, page_end)
+        if not page_nums:
+            return
+        total = len(page_nums)
+
+        # Phase 1: Direct extraction
+        logger.info("Phase 1: Attempting direct text extraction...")
+        ocr_pages = None
+        if self.speculative:
+            good, ocr_pages = self._race_phases(pdf_path, page_nums, ctx)
+        else:
+            good = self._extract_good_text_layer_pages(pdf_path, page_nums, ctx)
+        bad = [num for num in page_nums if num not in good]
         
-        # Check if it looks like English. If it's not English and has no Indic chars, it's garbage.
-        # Very simple check: ratio of standard English characters
-        english_like_chars = sum(1 for c in text if 'a' <= c.lower() <= 'z' or c.isdigit() or c in ' .,?!-\n\r\t')
-        english_ratio = english_like_chars / total_len
+        if not bad:
+            logger.info("✓ Phase 1 successful")
+            ctx.report_progress(total, total)
+            for num in page_nums:
+                yield num, good.pop(num)
+            return
         
-        if english_ratio < 0.7 and indic_char_count == 0:
-            logger.info(f"Quality Check: Failed script coherence (English Ratio: {english_ratio:.2f}, Indic Chars: {indic_char_count})")
-            return False
-            
-        return True
+        # Phase 2: Vision API fallback for the pages that failed the gate
+        logger.warning(
+            f"Phase 1 quality poor on {len(bad)} of {total} pages. "
+            f"Phase 2: Vision OCR via '{self.pdf_engine}' engine (auto-lang)..."
+        )
+        pages_done = total - len(bad)
+        ctx.report_progress(pages_done, total)
+        ctx.check_cancelled()
+        if ocr_pages is None:
+            ocr_pages = self._iter_pages_via_vision(pdf_path, bad, ctx)
+        failed = False
+        try:
+            for num in page_nums:
+                if num in good:
+                    yield num, good.pop(num)
+                    continue
+                ocr_num, text = next(ocr_pages, (num, None))
+                if ocr_num != num:
+                    raise RuntimeError(f"Page pipeline out of order: expected {num}, got {ocr_num}")
+                failed = failed or text is None
+                pages_done += 1
+                ctx.report_progress(pages_done, total)
+                yield num, text
+        finally:
+            ocr_pages.close()
+        # Every page was delivered: their checkpoint has served its purpose. Runs with failed or
+        # fallback pages keep theirs, so a resubmission only redoes those pages.
+        if not failed and not ctx.degraded:
+            self._discard_checkpoint(ctx, bad)
 
-    def _extract_text_from_pdf_hybrid(self, pdf_path: str, page_start: Optional[int] = None, page_end: Optional[int] = None) -> str:
+    def _race_phases(
+        self,
+        pdf_path: str,
+        page_nums: List[int],
+        ctx: OCRContext,
+    ) -> Tuple[Dict[int, str], Optional[Iterator[Tuple[int, Optional[str]]]]]:
         """
-        Hybrid PDF OCR Strategy: Direct extraction first, then Vision API fallback.
+        Speculative mode: run Phase 1 while Phase 2 OCRs the range from the start in the background.
+        Returns the good text-layer pages and, if any pages failed the gate, an in-order iterator of
+        Vision results for exactly those pages. The speculative run is kept only if every page failed;
+        otherwise it is cancelled and its finished pages are reused for the failed ones.
         """
+        speculative = SpeculativeOCR(lambda run_ctx: self._iter_pages_via_vision(pdf_path, page_nums, run_ctx), ctx)
         try:
-            # Phase 1: Direct extraction
-            logger.info("Phase 1: Attempting direct text extraction...")
-            extracted_text = self._extract_text_directly_from_pdf(pdf_path, page_start=page_start, page_end=page_end)
-            
-            if self._is_text_quality_good(extracted_text):
-                logger.info("✓ Phase 1 successful")
-                return extracted_text
-            
-            # Phase 2: Vision API fallback
-            logger.warning("Phase 1 quality poor. Phase 2: Image-based OCR (auto-lang)...")
-            return self._extract_text_via_images(pdf_path, page_start=page_start, page_end=page_end)
-            
-        except Exception as e:
-            logger.error(f"Error in hybrid OCR: {e}")
-            return ""
+            good = self._extract_good_text_layer_pages(pdf_path, page_nums, ctx)
+        except BaseException:
+            speculative.stop()
+            raise
 
-    def _extract_text_directly_from_pdf(self, pdf_path: str, page_start: Optional[int] = None, page_end: Optional[int] = None) -> str:
-        """Fast parallel direct text extraction from searchable PDFs."""
+        bad = [num for num in page_nums if num not in good]
+        if len(bad) == len(page_nums) and not speculative.failed:
+            logger.info(f"Speculation: Phase 2 wins with {speculative.delivered} pages already recognized")
+            return good, speculative.pages()
+
+        recognized = speculative.stop()
+        # The speculative run checkpointed pages that keep their text layer; nothing will resume them
+        self._discard_checkpoint(ctx, list(good))
+        if not bad:
+            logger.info(f"Speculation: Phase 1 wins, Phase 2 cancelled after {len(recognized)} pages")
+            return good, None
+        bad_set = set(bad)
+        # `recognized` is a prefix of the range, so reused pages all come before the rest
+        reused = [(num, text) for num, text in recognized if num in bad_set]
+        done = {num for num, _ in reused}
+        rest = [num for num in bad if num not in done]
+        logger.info(
+            f"Speculation: mixed verdict, reusing {len(reused)} recognized pages and OCR-ing {len(rest)} more"
+        )
+        return good, self._chain_pages(reused, self._iter_pages_via_vision(pdf_path, rest, ctx))
+
+    @staticmethod
+    def _chain_pages(
+        first: List[Tuple[int, Optional[str]]],
+        rest: Generator[Tuple[int, Optional[str]], None, None],
+    ) -> Iterator[Tuple[int, Optional[str]]]:
+        """Yield already available pages, then the rest, closing the rest when done or abandoned"""
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                total_pages = len(pdf.pages)
-                start = max(1, page_start) if page_start else 1
-                end = min(total_pages, page_end) if page_end else total_pages
-                
-                # Create a list of page indices to process
-                pages_to_process = list(range(start - 1, end))
-                
-                # Helper function for parallel processing
-                def extract_single_page(page_idx):
-                    try:
-                        # Re-open in each thread to avoid session sharing issues if any
-                        with pdfplumber.open(pdf_path) as inner_pdf:
-                            return page_idx + 1, inner_pdf.pages[page_idx].extract_text() or ""
-                    except Exception as e:
-                        logger.error(f"Error extracting page {page_idx + 1}: {e}")
-                        return page_idx + 1, ""
-
-                # Process in parallel
-                results = []
-                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pages_to_process) or 1)) as executor:
-                    futures = [executor.submit(extract_single_page, idx) for idx in pages_to_process]
-                    for future in as_completed(futures):
-                        results.append(future.result())
-                
-                # Sort and join
-                results.sort(key=lambda x: x[0])
-                text_parts = [f"--- Page {num} ---\n{text}" for num, text in results if text]
-                return "\n\n".join(text_parts)
-                
-        except Exception as e:
-            logger.error(f"Direct extraction error: {e}")
-            return ""
+            yield from first
+            yield from rest
+        finally:
+            rest.close()
 
-    def _extract_text_via_images(self, pdf_path: str, page_start: Optional[int] = None, page_end: Optional[int] = None) -> str:
+    def _extract_good_text_layer_pages(self, pdf_path: str, page_nums: List[int], ctx: OCRContext) -> Dict[int, str]:
         """
-        Convert PDF to images and OCR via Vision API.
-        Optimized: Uses disk-based conversion to handle very large PDFs.
+        Phase 1: return the pages whose text layer passes the quality gate.
+        Large ranges are probed on an evenly spread sample first; if the sample clearly fails
+        (a scanned book), the rest of the range is not extracted at all.
         """
-        temp_dir = tempfile.mkdtemp()
+        probe = sample_pages(page_nums, margin=self.probe_margin)
+        remaining = page_nums
+        good: Dict[int, str] = {}
+        # Only worth it when the probe is a small part of the range
+        if len(probe) * 2 <= len(page_nums):
+            probe_good = {
+                num: text for num, text in self._extract_pages_directly_from_pdf(pdf_path, probe, ctx)
+                if self._is_text_quality_good(text)
+            }
+            if len(probe_good) <= self.probe_min_good * len(probe):
+                logger.info(
+                    f"Phase 1: text layer failed on {len(probe) - len(probe_good)} of {len(probe)} probe pages; "
+                    f"skipping extraction of the other {len(page_nums) - len(probe)}"
+                )
+                return probe_good
+            good.update(probe_good)
+            probed = set(probe)
+            remaining = [num for num in page_nums if num not in probed]
+
+        for num, text in self._extract_pages_directly_from_pdf(pdf_path, remaining, ctx):
+            if self._is_text_quality_good(text):
+                good[num] = text
+        return good
+
+    def _resolve_page_range(self, pdf_path: str, page_start: Optional[int], page_end: Optional[int]) -> List[int]:
+        """Clamp the requested page range to the document and return its page numbers"""
+        total_pages = pdfinfo_from_path(pdf_path)["Pages"]
+        first = max(1, page_start or 1)
+        last = min(total_pages, page_end) if page_end else total_pages
+        return list(range(first, last + 1))
+
+    def _extract_pages_directly_from_pdf(
+        self,
+        pdf_path: str,
+        page_nums: List[int],
+        ctx: OCRContext,
+    ) -> List[Tuple[int, str]]:
+        """
+        Direct text extraction from searchable PDFs. Returns sorted (page_num, text) pairs.
+        Pages already in the page cache are not extracted again; the rest are sharded
+        across the text extractor's worker processes.
+        """
+        cached = self._get_cached_pages(ctx, page_nums, PAGE_SOURCE_TEXT_LAYER)
+        results = list(cached.items())
+        missing = [num for num in page_nums if num not in cached]
+        if cached:
+            logger.info(f"Phase 1: {len(cached)} of {len(page_nums)} pages served from page cache")
+
+        if missing:
+            ctx.check_cancelled()
+            for page_num, text in self.text_extractor.extract(pdf_path, missing):
+                if text is not None:
+                    self._cache_page(ctx, page_num, PAGE_SOURCE_TEXT_LAYER, text)
+                results.append((page_num, text or ""))
+
+        results.sort(key=lambda x: x[0])
+        return results
+
+    def _iter_pages_via_vision(
+        self,
+        pdf_path: str,
+        page_nums: List[int],
+        ctx: OCRContext,
+    ) -> Iterator[Tuple[int, Optional[str]]]:
+        """
+        Phase 2: OCR the given (sorted) pages with the configured engine, yielding (page_num, text)
+        in page order (text is None for pages that failed). Pages found in the page cache are
+        stitched in without another Vision call; freshly recognized pages are added to it.
+        """
+        cached = self._get_cached_pages(ctx, page_nums, PAGE_SOURCE_VISION)
+        restored = self._load_checkpoint(ctx, [num for num in page_nums if num not in cached])
+        if restored:
+            logger.info(f"Resuming from checkpoint: {len(restored)} pages recognized by an earlier run")
+            cached.update(restored)
+        missing = [num for num in page_nums if num not in cached]
+        logger.info(f"Phase 2: {len(page_nums)} pages: {len(cached)} already recognized, {len(missing)} to OCR")
+
+        fresh = None
+        if missing and self.pdf_engine == PDF_ENGINE_FILES:
+            fresh = self._iter_pages_via_files(pdf_path, missing, ctx)
+        elif missing:
+            fresh = self._iter_pages_via_images(pdf_path, missing, ctx)
+
         try:
-            logger.info(f"Converting PDF to images (pages {page_start or 1} to {page_end or 'end'})...")
-            
-            # Use convert_from_path with output_folder to keep RAM usage low
-            paths = convert_from_path(
-                pdf_path, 
-                dpi=200, 
-                first_page=page_start or 1, 
-                last_page=page_end,
-                output_folder=temp_dir,
-                fmt="jpeg",
-                paths_only=True
-            )
-            
-            total_converted = len(paths)
-            logger.info(f"Successfully converted {total_converted} pages to storage")
-            
-            results: List[Tuple[int, str]] = []
-            start_num = page_start or 1
-            
-            # Batching to avoid overwhelming the Vision API (and threadpool management)
-            batch_size = 10
-            for i in range(0, len(paths), batch_size):
-                batch_paths = paths[i:i+batch_size]
-                batch_start_idx = i
-                
-                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                    futures = {
-                        executor.submit(self._ocr_page_from_path, path, start_num + batch_start_idx + idx): (start_num + batch_start_idx + idx) 
-                        for idx, path in enumerate(batch_paths)
+            for page_num in page_nums:
+                if page_num in cached:
+                    text = cached.pop(page_num)
+                else:
+                    fresh_num, text = next(fresh, (page_num, None))
+                    if fresh_num != page_num:
+                        raise RuntimeError(f"Page pipeline out of order: expected {page_num}, got {fresh_num}")
+                    if text is not None:
+                        self._cache_page(ctx, page_num, PAGE_SOURCE_VISION, text)
+                yield page_num, text
+        finally:
+            if fresh is not None:
+                fresh.close()
+
+    def _iter_pages_via_images(
+        self,
+        pdf_path: str,
+        pages: List[int],
+        ctx: OCRContext,
+    ) -> Iterator[Tuple[int, Optional[str]]]:
+        """
+        Convert PDF pages to images and OCR via Vision API, yielding (page_num, text) in the
+        order of `pages` (text is None for pages that failed).
+        Pipelined: a producer thread renders runs of consecutive pages with poppler in windows of
+        `raster_window` while OCR workers process the pages already on disk, grouped into
+        batch_annotate_images calls of up to `image_batch_size` pages. At most `reorder_window`
+        pages are rendered but not yet delivered at any time, which bounds both the images in the
+        temp dir and the out-of-order results held in memory.
+        Once the request deadline passes nothing more is rendered; the remaining pages fail.
+        """
+        logger.info(f"Rasterizing and OCR-ing {len(pages)} pages...")
+
+        temp_dir = tempfile.mkdtemp()
+        slots = threading.Semaphore(self.reorder_window)
+        stop = threading.Event()
+        rendered: queue.Queue = queue.Queue()
+        futures: List[Future] = []
+        window_size = min(max(self.raster_window, self.image_batch_size), self.reorder_window)
+
+        def acquire_slot() -> bool:
+            while not stop.is_set() and not ctx.cancelled:
+                if slots.acquire(timeout=0.5):
+                    return True
+            return False
+
+        def produce():
+            error = None
+            try:
+                for window_start, window_end in self._page_runs(pages, window_size):
+                    for _ in range(window_end - window_start + 1):
+                        if not acquire_slot():
+                            return
+                    if ctx.expired:
+                        logger.warning(f"Request deadline reached: not rendering pages {window_start} onwards")
+                        return
+
+                    dpis = {
+                        num: self.dpi_planner.initial_dpi(dpi)
+                        for num, dpi in self._plan_page_dpis(pdf_path, window_start, window_end).items()
                     }
-                    
-                    for future in as_completed(futures):
-                        page_num = futures[future]
-                        try:
-                            results.append((page_num, future.result()))
-                        except Exception as e:
-                            logger.error(f"Page {page_num} OCR failed: {e}")
-
-            results.sort(key=lambda x: x[0])
-            return "\n\n".join([f"--- Page {num} ---\n{text}" for num, text in results if text])
-            
-        except Exception as e:
-            logger.error(f"Critical error in image-based OCR: {e}", exc_info=True)
-            return f"[Error processing document: {str(e)}]"
+                    for run_start, run_end, dpi in self._dpi_runs(window_start, window_end, dpis):
+                        if ctx.cancelled:
+                            return
+                        if ctx.expired:
+                            logger.warning(f"Request deadline reached: not rendering pages {run_start} onwards")
+                            return
+                        paths = self._render_pages(pdf_path, run_start, run_end, dpi, temp_dir)
+                        for batch in self._group_image_batches(list(zip(range(run_start, run_end + 1), paths))):
+                            future = self.worker_pool.submit(
+                                self._ocr_image_batch_and_discard, batch, pdf_path, dpi, temp_dir, ctx,
+                                flow=ctx.flow, cost=len(batch),
+                            )
+                            futures.append(future)
+                            for page_num, _ in batch:
+                                rendered.put((page_num, future))
+            except Exception as e:
+                error = e
+            finally:
+                rendered.put((None, error))
+
+        producer = threading.Thread(target=produce, name="pdf-raster", daemon=True)
+        producer.start()
+        delivered = 0
+        try:
+            while True:
+                ctx.check_cancelled()
+                try:
+                    page_num, item = rendered.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if page_num is None:
+                    if item:
+                        raise item
+                    break
+
+                try:
+                    text = self._result_unless_cancelled(item, ctx).get(page_num)
+                except OCRCancelled:
+                    raise
+                except Exception as e:
+                    logger.error(f"Page {page_num} OCR failed: {e}")
+                    text = None
+                slots.release()
+                delivered += 1
+                yield page_num, text
+
+            # Pages the producer never rendered (request deadline reached)
+            for page_num in pages[delivered:]:
+                yield page_num, None
         finally:
+            stop.set()
+            producer.join()
+            # The pool is shared: cancel this document's queued work and let running tasks finish
+            # (they stop early once the request is cancelled) before their images are deleted
+            dropped = sum(future.cancel() for future in futures)
+            if ctx.cancelled:
+                logger.info(f"OCR cancelled: rasterizer stopped, {dropped} queued batches dropped")
+            wait(futures)
             # Clean up all temporary images
             shutil.rmtree(temp_dir, ignore_errors=True)
 
-    def _ocr_page_from_path(self, img_path: str, page_num: int) -> str:
-        """Perform OCR on a single image file with auto-lang detection"""
+    def _render_pages(self, pdf_path: str, first_page: int, last_page: int, dpi: int, output_folder: str) -> List[str]:
+        """Render a run of pages to JPEG files and return their paths in page order"""
+        # Use convert_from_path with output_folder to keep RAM usage low
+        return convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=first_page,
+            last_page=last_page,
+            output_folder=output_folder,
+            fmt="jpeg",
+            grayscale=self.preprocessor.enabled and self.preprocessor.grayscale,
+            paths_only=True
+        )
+
+    def _plan_page_dpis(self, pdf_path: str, first_page: int, last_page: int) -> Dict[int, int]:
+        """Render DPI for each page of a run; falls back to the fixed DPI if planning fails"""
+        planner = self.dpi_planner
+        pages = range(first_page, last_page + 1)
+        if not planner.enabled:
+            return {num: planner.default_dpi for num in pages}
+        try:
+            sizes = parse_page_sizes(pdfinfo_from_path(pdf_path, first_page=first_page, last_page=last_page))
+            probes = convert_from_path(
+                pdf_path, first_page=first_page, last_page=last_page, size=planner.probe_size, grayscale=True
+            )
+            dpis = {num: planner.choose_dpi(sizes.get(num), probe) for num, probe in zip(pages, probes)}
+        except Exception as e:
+            logger.warning(f"DPI planning failed for pages {first_page}-{last_page} ({e}), using {planner.default_dpi} dpi")
+            return {num: planner.default_dpi for num in pages}
+        logger.info(f"Pages {first_page}-{last_page} planned at {sorted(set(dpis.values()))} dpi")
+        return {num: dpis.get(num, planner.default_dpi) for num in pages}
+
+    @staticmethod
+    def _dpi_runs(first_page: int, last_page: int, dpis: Dict[int, int]) -> List[Tuple[int, int, int]]:
+        """Split a page run into (first, last, dpi) sub-runs of consecutive pages sharing a DPI"""
+        runs: List[Tuple[int, int, int]] = []
+        for num in range(first_page, last_page + 1):
+            if runs and runs[-1][2] == dpis[num]:
+                runs[-1] = (runs[-1][0], num, dpis[num])
+            else:
+                runs.append((num, num, dpis[num]))
+        return runs
+
+    @staticmethod
+    def _page_runs(pages: List[int], max_len: int) -> List[Tuple[int, int]]:
+        """Split sorted page numbers into (first, last) runs of consecutive pages, each at most max_len long"""
+        runs: List[Tuple[int, int]] = []
+        for num in pages:
+            if runs and num == runs[-1][1] + 1 and num - runs[-1][0] < max_len:
+                runs[-1] = (runs[-1][0], num)
+            else:
+                runs.append((num, num))
+        return runs
+
+    def _iter_pages_via_files(
+        self,
+        pdf_path: str,
+        pages: List[int],
+        ctx: OCRContext,
+    ) -> Iterator[Tuple[int, Optional[str]]]:
+        """
+        OCR scanned PDF pages by sending the PDF itself to Vision, yielding (page_num, text) in the
+        order of `pages` (text is None for pages that failed).
+        The pages are split into sub-documents of up to 5 pages (the batch_annotate_files
+        inline limit), which are dispatched in parallel; at most `max_workers` are in flight.
+        Once the request deadline passes no more chunks are sent; their pages fail.
+        """
+        chunks = deque(
+            pages[i:i + FILES_MAX_PAGES_PER_REQUEST] for i in range(0, len(pages), FILES_MAX_PAGES_PER_REQUEST)
+        )
+        logger.info(f"Sending {len(pages)} pages to Vision as {len(chunks)} inline PDF requests...")
+
+        in_flight: deque = deque()
+        skipped: List[int] = []
         try:
-            with open(img_path, 'rb') as f:
+            while chunks or in_flight:
+                ctx.check_cancelled()
+                if chunks and ctx.expired:
+                    skipped = [num for chunk_pages in chunks for num in chunk_pages]
+                    chunks.clear()
+                    logger.warning(f"Request deadline reached: {len(skipped)} pages not sent to Vision")
+                    continue
+                while chunks and len(in_flight) < self.max_workers:
+                    chunk_pages = chunks.popleft()
+                    in_flight.append((chunk_pages, self.worker_pool.submit(
+                        self._ocr_pdf_chunk, pdf_path, chunk_pages, ctx, flow=ctx.flow, cost=len(chunk_pages)
+                    )))
+
+                chunk_pages, future = in_flight.popleft()
+                try:
+                    chunk_texts = self._result_unless_cancelled(future, ctx)
+                except OCRCancelled:
+                    raise
+                except Exception as e:
+                    logger.error(f"Pages {chunk_pages} OCR failed: {e}")
+                    chunk_texts = {}
+
+                for page_num in chunk_pages:
+                    yield page_num, chunk_texts.get(page_num)
+
+            for page_num in skipped:
+                yield page_num, None
+        finally:
+            dropped = sum(future.cancel() for _, future in in_flight)
+            if ctx.cancelled:
+                logger.info(f"OCR cancelled: {dropped + len(chunks)} PDF chunks dropped")
+
+    @staticmethod
+    def _result_unless_cancelled(future: Future, ctx: OCRContext, poll: float = 0.5) -> Any:
+        """Wait for a page task's result, raising OCRCancelled as soon as the request is cancelled"""
+        while not wait([future], timeout=poll).done:
+            ctx.check_cancelled()
+        return future.result()
+
+    def _ocr_pdf_chunk(self, pdf_path: str, chunk_pages: List[int], ctx: OCRContext) -> Dict[int, str]:
+        """
+        Cut the given pages into a sub-PDF and OCR it with one batch_annotate_files call,
+        retrying transient failures within the page deadline
+        """
+        if ctx.cancelled:
+            return {}
+        chunk_dir = tempfile.mkdtemp()
+        try:
+            # poppler-utils (already required by pdf2image) splits and re-joins the pages.
+            # Chunks can be sparse, so only the requested runs are split out.
+            for first, last in self._page_runs(chunk_pages, len(chunk_pages)):
+                subprocess.run(
+                    ["pdfseparate", "-f", str(first), "-l", str(last), pdf_path,
+                     os.path.join(chunk_dir, "page-%d.pdf")],
+                    check=True, capture_output=True
+                )
+            page_files = [os.path.join(chunk_dir, f"page-{num}.pdf") for num in chunk_pages]
+            chunk_path = os.path.join(chunk_dir, "chunk.pdf")
+            if len(page_files) == 1:
+                chunk_path = page_files[0]
+            else:
+                subprocess.run(["pdfunite", *page_files, chunk_path], check=True, capture_output=True)
+
+            with open(chunk_path, 'rb') as f:
                 content = f.read()
-            return self._extract_text_from_image(content)
+
+            request = vision.AnnotateFileRequest(
+                input_config=vision.InputConfig(content=content, mime_type="application/pdf"),
+                features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+                image_context=vision.ImageContext(language_hints=self.language_hints),
+                pages=list(range(1, len(page_files) + 1)),
+            )
+
+            deadline = ctx.page_deadline(self.retry_policy.page_timeout)
+
+            def attempt(timeout: float):
+                with self._vision_slot(len(chunk_pages), deadline, ctx):
+                    response = self.client.batch_annotate_files(
+                        requests=[request], retry=None, timeout=self._rpc_timeout(timeout, deadline)
+                    )
+                self._raise_for_response_error(response.responses[0])
+                return response.responses[0]
+
+            file_response = self._call_vision("batch_annotate_files", attempt, deadline, len(chunk_pages), ctx=ctx)
+
+            texts: Dict[int, str] = {}
+            for idx, page_response in enumerate(file_response.responses):
+                # context.page_number is 1-based within the sub-document
+                page_num = chunk_pages[(page_response.context.page_number or idx + 1) - 1]
+                if page_response.error.message:
+                    logger.error(f"Vision API error on page {page_num}: {page_response.error.message}")
+                    continue
+                texts[page_num] = self._text_from_response(page_response)
+            self._checkpoint_pages(ctx, texts)
+            return texts
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+
+    def _group_image_batches(self, pages: List[Tuple[int, str]]) -> List[List[Tuple[int, str]]]:
+        """Split (page_num, image_path) pairs into batches within the count and payload limits"""
+        batches: List[List[Tuple[int, str]]] = []
+        current: List[Tuple[int, str]] = []
+        current_bytes = 0
+        for page_num, path in pages:
+            size = os.path.getsize(path)
+            if current and (len(current) >= self.image_batch_size or current_bytes + size > IMAGES_MAX_BYTES_PER_REQUEST):
+                batches.append(current)
+                current, current_bytes = [], 0
+            current.append((page_num, path))
+            current_bytes += size
+        if current:
+            batches.append(current)
+        return batches
+
+    def _ocr_image_batch_and_discard(
+        self,
+        batch: List[Tuple[int, str]],
+        pdf_path: str,
+        dpi: int,
+        temp_dir: str,
+        ctx: OCRContext,
+    ) -> Dict[int, Optional[str]]:
+        """
+        OCR a batch of page images rendered at `dpi` and delete them right away to free temp space.
+        Pages recognized with low confidence are re-rendered at a higher DPI (see _escalate_page).
+        The batch shares one page deadline, started when a worker picks it up.
+        """
+        deadline = ctx.page_deadline(self.retry_policy.page_timeout)
+        try:
+            results = {} if ctx.cancelled else self._ocr_image_batch(batch, deadline, ctx)
+        finally:
+            for _, img_path in batch:
+                if os.path.exists(img_path):
+                    os.remove(img_path)
+        texts = {
+            page_num: self._escalate_page(pdf_path, page_num, dpi, temp_dir, result, deadline, ctx)
+            for page_num, result in results.items()
+        }
+        self._checkpoint_pages(ctx, texts)
+        return texts
+
+    def _escalate_page(
+        self,
+        pdf_path: str,
+        page_num: int,
+        dpi: int,
+        temp_dir: str,
+        result: Optional[ScoredText],
+        deadline: float,
+        ctx: OCRContext,
+    ) -> Optional[str]:
+        """
+        Progressive DPI escalation: while Vision's confidence for a page is below the planner's
+        threshold, re-render it at the next DPI step and OCR it again, keeping the most confident text.
+        """
+        if result is None:
+            return None
+        text, confidence = result
+        planner = self.dpi_planner
+        start_dpi, start_confidence = dpi, confidence
+        limit_dpi = None
+        for attempt in range(planner.max_escalations):
+            if confidence is None or confidence >= planner.escalate_below:
+                break
+            if time.monotonic() >= deadline or ctx.cancelled:
+                break
+            if attempt == 0:
+                limit_dpi = self._render_dpi_limit(pdf_path, page_num)
+            next_dpi = planner.next_dpi(dpi, limit_dpi)
+            if next_dpi is None:
+                if limit_dpi is not None and dpi < planner.max_dpi:
+                    logger.info(f"Page {page_num}: not escalating past {dpi} dpi, renders would exceed the pixel cap")
+                break
+            dpi = next_dpi
+            try:
+                img_path = self._render_pages(pdf_path, page_num, page_num, dpi, temp_dir)[0]
+                try:
+                    retry = self._ocr_page_from_path(img_path, page_num, deadline, ctx, rendered=True)
+                finally:
+                    os.remove(img_path)
+            except Exception as e:
+                logger.error(f"Re-rendering page {page_num} at {dpi} dpi failed: {e}")
+                break
+            if retry is not None and (retry[1] or 0) >= confidence:
+                text, confidence = retry
+
+        if dpi != start_dpi:
+            logger.info(
+                f"Page {page_num}: confidence {start_confidence:.2f} at {start_dpi} dpi, "
+                f"escalated to {dpi} dpi ({(confidence or 0):.2f})"
+            )
+        return text
+
+    def _render_dpi_limit(self, pdf_path: str, page_num: int) -> Optional[float]:
+        """Highest DPI at which a render of the page stays under the preprocessor's render pixel cap"""
+        if not (self.preprocessor.enabled and self.preprocessor.max_render_pixels):
+            return None
+        try:
+            size = parse_page_sizes(pdfinfo_from_path(pdf_path, first_page=page_num, last_page=page_num)).get(page_num)
         except Exception as e:
-            logger.error(f"Error OCR-ing {img_path}: {e}")
-            return ""
+            logger.warning(f"Could not read the size of page {page_num}: {e}")
+            return None
+        return self.dpi_planner.budget_dpi(size, self.preprocessor.max_render_pixels) if size else None
+
+    def _ocr_image_batch(
+        self, batch: List[Tuple[int, str]], deadline: float, ctx: OCRContext, rendered: bool = True
+    ) -> Dict[int, Optional[ScoredText]]:
+        """
+        OCR several page images with one batch_annotate_images call.
+        Responses come back in request order; pages whose slot errored
+        (or the whole batch, if the call itself fails) are retried one by one.
+        Returns (text, confidence) per page; pages that still fail map to None.
+        `rendered` is False for uploaded images (as opposed to PDF page renders).
+        """
+        if len(batch) == 1:
+            page_num, img_path = batch[0]
+            return {page_num: self._ocr_page_from_path(img_path, page_num, deadline, ctx, rendered=rendered)}
+
+        contents = [self._read_image_for_upload(img_path, rendered=rendered) for _, img_path in batch]
+
+        results: Dict[int, Optional[ScoredText]] = {}
+        retry: List[int] = []
+        try:
+            context = vision.ImageContext(language_hints=self.language_hints)
+            features = [vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)]
+            requests = [
+                vision.AnnotateImageRequest(image=vision.Image(content=content), features=features, image_context=context)
+                for content in contents
+            ]
+
+            def attempt(timeout: float):
+                with self._vision_slot(len(requests), deadline, ctx):
+                    return self.client.batch_annotate_images(
+                        requests=requests, retry=None, timeout=self._rpc_timeout(timeout, deadline)
+                    )
+
+            response = self._call_vision("batch_annotate_images", attempt, deadline, len(requests), ctx=ctx)
+            for idx, (page_num, _) in enumerate(batch):
+                page_response = response.responses[idx] if idx < len(response.responses) else None
+                if page_response is None or page_response.error.message:
+                    error = page_response.error.message if page_response is not None else "missing response"
+                    if page_response is not None and page_response.error.code in OVERLOAD_STATUS_CODES:
+                        self.call_limiter.record_overload()
+                    logger.warning(f"Batch slot for page {page_num} failed ({error}), retrying individually")
+                    retry.append(idx)
+                else:
+                    results[page_num] = self._scored_text_from_response(page_response)
+        except OCRCancelled:
+            return results
+        except Exception as e:
+            logger.error(f"Batch OCR of pages {batch[0][0]}-{batch[-1][0]} failed: {e}, retrying individually")
+            retry = list(range(len(batch)))
+
+        if ctx.cancelled:
+            return results
+        for idx in retry:
+            page_num = batch[idx][0]
+            try:
+                results[page_num] = self._recognize_image(contents[idx], deadline, ctx)
+            except Exception as e:
+                logger.error(f"Page {page_num} OCR failed: {e}")
+                results[page_num] = None
+        return results
+
+    def _ocr_page_from_path(
+        self, img_path: str, page_num: int, deadline: float, ctx: OCRContext, rendered: bool = True
+    ) -> Optional[ScoredText]:
+        """Perform OCR on a single image file with auto-lang detection; None if it failed"""
+        try:
+            return self._recognize_image(self._read_image_for_upload(img_path, rendered=rendered), deadline, ctx)
+        except OCRCancelled:
+            return None
+        except Exception as e:
+            logger.error(f"Error OCR-ing page {page_num} ({img_path}): {e}")
+            return None
 
 class GoogleCloudClient:
     """Wrapper for Google Cloud APIs"""
 
     def __init__(self):
         self.vision_client = vision.ImageAnnotatorClient()
-        self.vision_service = VisionService(self.vision_client)
+        # Shared by every request: page OCR threads and the cap on in-flight Vision RPCs
+        self.worker_pool = create_worker_pool()
+        self.call_limiter = create_call_limiter()
+        # Only errors that indicate Vision itself is unhealthy count towards tripping the breaker
+        self.breaker = create_circuit_breaker(is_failure=is_transient)
+        self.vision_service = VisionService(
+            self.vision_client,
+            pdf_engine=os.getenv("VISION_PDF_ENGINE", PDF_ENGINE_RASTER),
+            image_batch_size=int(os.getenv("VISION_IMAGE_BATCH_SIZE", "4")),
+            result_cache=create_result_cache(),
+            text_extractor=create_text_extractor(),
+            speculative=os.getenv("VISION_SPECULATIVE_OCR", "false").lower() in ("1", "true", "yes"),
+            preprocessor=create_image_preprocessor(),
+            dpi_planner=create_dpi_planner(),
+            worker_pool=self.worker_pool,
+            call_limiter=self.call_limiter,
+            retry_policy=create_retry_policy(),
+            request_timeout=float(os.getenv("VISION_REQUEST_TIMEOUT_SECONDS", "1800")) or None,
+            hedger=create_request_hedger(),
+            breaker=self.breaker,
+            fallback_engine=create_fallback_engine(),
+            checkpoints=create_checkpoint_store(),
+        )
 
     def get_vision_service(self) -> VisionService:
         return self.vision_service
 
+    def stats(self) -> Dict[str, Any]:
+        """Runtime metrics for the health endpoint"""
+        return {
+            "worker_pool": self.worker_pool.stats(),
+            "vision_calls": self.call_limiter.stats(),
+            "image_preprocessing": self.vision_service.preprocessor.stats(),
+            "hedging": self.vision_service.hedger.stats() if self.vision_service.hedger else {"enabled": False},
+            "checkpoints": (
+                self.vision_service.checkpoints.stats() if self.vision_service.checkpoints else {"enabled": False}
+            ),
+            "circuit_breaker": {
+                **(self.breaker.stats() if self.breaker else {"enabled": False}),
+                "fallback_engine": self.vision_service.fallback_engine.name if self.vision_service.fallback_engine else None,
+            },
+        }
+
 _google_client = None
 
 def get_google_client() -> GoogleCloudClient:
@@ -0,0 +1,168 @@
+"""
+Image Preprocessing
+Shrinks images before they are uploaded to Vision: EXIF rotation, grayscale,
+a pixel-count cap, blank-margin trimming and JPEG re-encoding. Phone photos
+routinely arrive as 8 MB 12 MP colour JPEGs while document OCR needs far less.
+"""
+import io
+import os
+import logging
+import math
+import threading
+from typing import Any, Dict
+
+from PIL import Image, ImageChops, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePreprocessor:
+    """
+    Turns uploaded or rendered images into smaller Vision payloads.
+    The original bytes are kept whenever decoding fails or re-encoding doesn't make them smaller.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        grayscale: bool = True,
+        max_pixels: int = 6_250_000,
+        max_render_pixels: int = 40_000_000,
+        trim_margins: bool = True,
+        jpeg_quality: int = 85,
+        margin_tolerance: int = 40,
+        margin_padding: float = 0.02,
+    ):
+        self.enabled = enabled
+        self.grayscale = grayscale
+        # Pixel-count caps rather than a longest-side cap, so long narrow images (palm-leaf folios,
+        # scrolls) keep their resolution. Uploads: 6.25 MP keeps small Indic matras and conjuncts
+        # legible on a full page. PDF renders were already sized by their planned DPI and only
+        # hit the much larger render cap on oversized pages.
+        self.max_pixels = max(0, max_pixels)
+        self.max_render_pixels = max(0, max_render_pixels)
+        self.trim_margins = trim_margins
+        self.jpeg_quality = max(1, min(jpeg_quality, 95))
+        # How far (0-255) a pixel may differ from the background colour and still count as margin
+        self.margin_tolerance = margin_tolerance
+        # Padding kept around the trimmed content, as a fraction of the image size
+        self.margin_padding = margin_padding
+
+        self._lock = threading.Lock()
+        self._images = 0
+        self._unchanged = 0
+        self._failed = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def settings(self) -> Dict[str, Any]:
+        """Settings that change what Vision sees; part of the OCR cache keys"""
+        if not self.enabled:
+            return {"preprocess": False}
+        return {
+            "preprocess": True,
+            "grayscale": self.grayscale,
+            "max_pixels": self.max_pixels,
+            "max_render_pixels": self.max_render_pixels,
+            "trim_margins": self.trim_margins,
+            "jpeg_quality": self.jpeg_quality,
+        }
+
+    def process(self, data: bytes, rendered: bool = False) -> bytes:
+        """Return the bytes to upload for an image; `rendered` marks a PDF page rendered at a chosen DPI"""
+        if not self.enabled or not data:
+            return data
+
+        try:
+            out = self._transform(data, self.max_render_pixels if rendered else self.max_pixels)
+        except Exception as e:
+            logger.warning(f"Image preprocessing failed, uploading original: {e}")
+            self._record(len(data), len(data), failed=True)
+            return data
+
+        if len(out) >= len(data):
+            self._record(len(data), len(data), unchanged=True)
+            return data
+        self._record(len(data), len(out))
+        return out
+
+    def _transform(self, data: bytes, max_pixels: int) -> bytes:
+        with Image.open(io.BytesIO(data)) as source:
+            # Re-encoding drops EXIF, so apply the camera orientation to the pixels first
+            img = self._flatten(ImageOps.exif_transpose(source))
+            img = img.convert("L" if self.grayscale else "RGB")
+
+        if self.trim_margins:
+            img = self._trim(img)
+        width, height = img.size
+        if max_pixels and width * height > max_pixels:
+            scale = math.sqrt(max_pixels / (width * height))
+            img = img.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=self.jpeg_quality, optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _flatten(img: Image.Image) -> Image.Image:
+        """Composite transparent images onto white; converting them directly turns transparent pixels black"""
+        if img.mode not in ("RGBA", "LA", "PA") and "transparency" not in img.info:
+            return img
+        background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, img.convert("RGBA")).convert("RGB")
+
+    def _trim(self, img: Image.Image) -> Image.Image:
+        """Crop away uniform margins, using the top-left pixel as the background colour"""
+        gray = img if img.mode == "L" else img.convert("L")
+        # Detect on a box-reduced copy: averaging blocks suppresses speckle noise that would
+        # otherwise stretch the bounding box to the edges, and is much cheaper
+        factor = max(1, max(gray.size) // 500)
+        small = gray.reduce(factor)
+        background = Image.new("L", small.size, small.getpixel((0, 0)))
+        diff = ImageChops.difference(small, background).point(lambda p: 255 if p > self.margin_tolerance else 0)
+        bbox = diff.getbbox()
+        if not bbox:
+            return img  # Blank page: nothing to trim to
+        bbox = tuple(v * factor for v in bbox)
+
+        width, height = img.size
+        pad_x, pad_y = int(width * self.margin_padding), int(height * self.margin_padding)
+        left, top = max(0, bbox[0] - pad_x), max(0, bbox[1] - pad_y)
+        right, bottom = min(width, bbox[2] + pad_x), min(height, bbox[3] + pad_y)
+        if (right - left) * (bottom - top) >= 0.95 * width * height:
+            return img
+        return img.crop((left, top, right, bottom))
+
+    def _record(self, bytes_in: int, bytes_out: int, unchanged: bool = False, failed: bool = False) -> None:
+        with self._lock:
+            self._images += 1
+            self._unchanged += unchanged
+            self._failed += failed
+            self._bytes_in += bytes_in
+            self._bytes_out += bytes_out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            saved = self._bytes_in - self._bytes_out
+            return {
+                "enabled": self.enabled,
+                "images": self._images,
+                "unchanged": self._unchanged,
+                "failed": self._failed,
+                "bytes_in": self._bytes_in,
+                "bytes_out": self._bytes_out,
+                "bytes_saved": saved,
+                "saved_ratio": round(saved / self._bytes_in, 3) if self._bytes_in else 0.0,
+            }
+
+
+def create_image_preprocessor() -> ImagePreprocessor:
+    """Build the preprocessor from environment settings (VISION_PREPROCESS=false disables it)"""
+    return ImagePreprocessor(
+        enabled=os.getenv("VISION_PREPROCESS", "true").lower() in ("1", "true", "yes"),
+        grayscale=os.getenv("VISION_PREPROCESS_GRAYSCALE", "true").lower() in ("1", "true", "yes"),
+        max_pixels=int(os.getenv("VISION_IMAGE_MAX_PIXELS", "6250000")),
+        max_render_pixels=int(os.getenv("VISION_RENDER_MAX_PIXELS", "40000000")),
+        trim_margins=os.getenv("VISION_TRIM_MARGINS", "true").lower() in ("1", "true", "yes"),
+        jpeg_quality=int(os.getenv("VISION_JPEG_QUALITY", "85")),
+    )
@@ -0,0 +1,47 @@
+"""
+Local OCR Fallback
+A local engine that can stand in for Vision while the Vision circuit is open.
+Tesseract (via pytesseract) is optional; without it there is no fallback and
+pages fail fast instead.
+"""
+import io
+import os
+import logging
+from typing import Optional
+
+from PIL import Image
+
+try:
+    import pytesseract
+except ImportError:  # Optional dependency
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+
+class TesseractEngine:
+    """Recognizes page images with a local Tesseract install"""
+
+    name = "tesseract"
+
+    def __init__(self, languages: str = "hin+san+eng"):
+        # Tesseract language packs, e.g. "hin+san+kan+tel+tam+ben+guj+mal+pan+mar+eng"
+        self.languages = languages
+
+    def recognize(self, image_bytes: bytes) -> str:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            return pytesseract.image_to_string(img, lang=self.languages)
+
+
+def create_fallback_engine() -> Optional[TesseractEngine]:
+    """Build the engine named by OCR_FALLBACK_ENGINE (only "tesseract" for now); None if unset or unavailable"""
+    engine = os.getenv("OCR_FALLBACK_ENGINE", "").lower()
+    if not engine:
+        return None
+    if engine != "tesseract":
+        logger.warning(f"Unknown OCR_FALLBACK_ENGINE '{engine}', running without a fallback")
+        return None
+    if pytesseract is None:
+        logger.warning("OCR_FALLBACK_ENGINE=tesseract but pytesseract is not installed, running without a fallback")
+        return None
+    return TesseractEngine(languages=os.getenv("TESSERACT_LANGS", "hin+san+eng"))
@@ -0,0 +1,155 @@
+"""
+OCR Result Cache
+Persistent, size-bounded cache of OCR output keyed by the SHA-256 of the
+uploaded file plus the settings that affect the result.
+Holds both whole-document results and individual recognized pages.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from typing import Optional, Dict, Any, List
+
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, func
+from sqlalchemy.orm import sessionmaker, declarative_base
+
+logger = logging.getLogger("indic-scribe.ocr-cache")
+
+Base = declarative_base()
+
+
+class CachedOCRResult(Base):
+    __tablename__ = "ocr_results"
+
+    key = Column(String, primary_key=True)
+    text = Column(Text)
+    size_bytes = Column(Integer)
+    created_at = Column(Float)
+    last_accessed = Column(Float, index=True)
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in chunks so large uploads aren't loaded into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(file_hash: str, **settings: Any) -> str:
+    """Combine a file hash with the settings that affect OCR output into one key"""
+    payload = json.dumps({"file": file_hash, **settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class OCRResultCache:
+    """
+    SQLite-backed cache of document and page OCR results.
+    Total stored text is kept under `max_bytes` by evicting least recently used entries.
+    """
+
+    def __init__(self, db_url: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.engine = create_engine(db_url, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # SQLite allows a single writer; serialize our own writes instead of hitting "database is locked"
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            db = self.SessionLocal()
+            try:
+                entry = db.query(CachedOCRResult).filter(CachedOCRResult.key == key).first()
+                if not entry:
+                    return None
+                entry.last_accessed = time.time()
+                db.commit()
+                return entry.text
+            except Exception as e:
+                logger.error(f"OCR cache read failed: {e}")
+                return None
+            finally:
+                db.close()
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """Look up several keys at once; returns only the keys that were found"""
+        if not keys:
+            return {}
+        found: Dict[str, str] = {}
+        with self._lock:
+            db = self.SessionLocal()
+            try:
+                now = time.time()
+                # Stay well below SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    entries = db.query(CachedOCRResult).filter(CachedOCRResult.key.in_(keys[i:i + 500])).all()
+                    for entry in entries:
+                        entry.last_accessed = now
+                        found[entry.key] = entry.text
+                db.commit()
+            except Exception as e:
+                logger.error(f"OCR cache read failed: {e}")
+            finally:
+                db.close()
+        return found
+
+    def put(self, key: str, text: str) -> None:
+        size = len(text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            db = self.SessionLocal()
+            try:
+                now = time.time()
+                db.merge(CachedOCRResult(key=key, text=text, size_bytes=size, created_at=now, last_accessed=now))
+                db.commit()
+                self._evict(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"OCR cache write failed: {e}")
+            finally:
+                db.close()
+
+    def _evict(self, db) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        total = db.query(func.coalesce(func.sum(CachedOCRResult.size_bytes), 0)).scalar()
+        if total <= self.max_bytes:
+            return
+
+        evict_keys = []
+        rows = db.query(CachedOCRResult.key, CachedOCRResult.size_bytes).order_by(CachedOCRResult.last_accessed.asc())
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            total -= size
+            evict_keys.append(key)
+
+        for i in range(0, len(evict_keys), 500):
+            db.query(CachedOCRResult).filter(
+                CachedOCRResult.key.in_(evict_keys[i:i + 500])
+            ).delete(synchronize_session=False)
+        db.commit()
+        logger.info(f"OCR cache evicted {len(evict_keys)} entries")
+
+    def stats(self) -> Dict[str, int]:
+        db = self.SessionLocal()
+        try:
+            entries, total = db.query(
+                func.count(CachedOCRResult.key), func.coalesce(func.sum(CachedOCRResult.size_bytes), 0)
+            ).one()
+            return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes}
+        finally:
+            db.close()
+
+
+def create_result_cache() -> Optional[OCRResultCache]:
+    """Build the cache from environment settings; OCR_CACHE_MAX_BYTES=0 disables it"""
+    max_bytes = int(os.getenv("OCR_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    if max_bytes <= 0:
+        return None
+    return OCRResultCache(os.getenv("OCR_CACHE_URL", "sqlite:///./ocr_cache.db"), max_bytes)
@@ -0,0 +1,137 @@
+"""
+OCR Checkpoints
+Durable per-page progress for documents being OCR'd. Every page Vision
+recognizes is written as soon as it completes, keyed by document hash (plus the
+OCR settings) and page number, so a resubmitted or interrupted document resumes
+where it stopped instead of starting over. Unlike the result cache nothing is
+evicted for space; pages are dropped once a run has delivered them, and
+abandoned checkpoints expire after a TTL.
+"""
+import os
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, func
+from sqlalchemy.orm import sessionmaker, declarative_base
+
+logger = logging.getLogger("indic-scribe.ocr-checkpoints")
+
+Base = declarative_base()
+
+
+class CheckpointPage(Base):
+    __tablename__ = "ocr_checkpoint_pages"
+
+    key = Column(String, primary_key=True)
+    page_num = Column(Integer, primary_key=True)
+    text = Column(Text)
+    updated_at = Column(Float, index=True)
+
+
+class OCRCheckpointStore:
+    """
+    SQLite-backed store of recognized pages for documents in progress.
+    `key` identifies a document and the settings it is processed with (see make_cache_key).
+    """
+
+    def __init__(self, db_url: str, ttl_seconds: float = 7 * 24 * 3600):
+        self.ttl_seconds = ttl_seconds
+        self.engine = create_engine(db_url, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self._lock = threading.Lock()
+        self._expire()
+
+    def load(self, key: str, page_nums: List[int]) -> Dict[int, str]:
+        """Return the checkpointed pages among `page_nums`"""
+        if not page_nums:
+            return {}
+        wanted = set(page_nums)
+        db = self.SessionLocal()
+        try:
+            rows = db.query(CheckpointPage.page_num, CheckpointPage.text).filter(CheckpointPage.key == key).all()
+            return {num: text for num, text in rows if num in wanted}
+        except Exception as e:
+            logger.error(f"Checkpoint read failed: {e}")
+            return {}
+        finally:
+            db.close()
+
+    def save(self, key: str, pages: Dict[int, str]) -> None:
+        """Record recognized pages (one transaction per call, e.g. per OCR batch)"""
+        if not pages:
+            return
+        with self._lock:
+            db = self.SessionLocal()
+            try:
+                now = time.time()
+                for page_num, text in pages.items():
+                    db.merge(CheckpointPage(key=key, page_num=page_num, text=text, updated_at=now))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Checkpoint write failed for pages {sorted(pages)}: {e}")
+            finally:
+                db.close()
+
+    def discard(self, key: str, page_nums: List[int]) -> None:
+        """Drop the given pages of a document's checkpoint once a run has delivered them"""
+        if not page_nums:
+            return
+        with self._lock:
+            db = self.SessionLocal()
+            try:
+                # Chunked to stay under SQLite's limit on bound parameters
+                for i in range(0, len(page_nums), 500):
+                    db.query(CheckpointPage).filter(
+                        CheckpointPage.key == key, CheckpointPage.page_num.in_(page_nums[i:i + 500])
+                    ).delete(synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Checkpoint cleanup failed: {e}")
+            finally:
+                db.close()
+        self._expire()
+
+    def _expire(self) -> None:
+        """Delete checkpoints of documents nobody came back for within the TTL (at startup and on each discard)"""
+        with self._lock:
+            db = self.SessionLocal()
+            try:
+                cutoff = time.time() - self.ttl_seconds
+                stale = db.query(CheckpointPage.key).group_by(CheckpointPage.key).having(
+                    func.max(CheckpointPage.updated_at) < cutoff
+                ).all()
+                for (key,) in stale:
+                    db.query(CheckpointPage).filter(CheckpointPage.key == key).delete(synchronize_session=False)
+                db.commit()
+                if stale:
+                    logger.info(f"Expired {len(stale)} abandoned OCR checkpoints")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Checkpoint expiry failed: {e}")
+            finally:
+                db.close()
+
+    def stats(self) -> Dict[str, int]:
+        db = self.SessionLocal()
+        try:
+            documents, pages = db.query(
+                func.count(func.distinct(CheckpointPage.key)), func.count(CheckpointPage.page_num)
+            ).one()
+            return {"documents": documents, "pages": pages}
+        finally:
+            db.close()
+
+
+def create_checkpoint_store() -> Optional[OCRCheckpointStore]:
+    """Build the store from environment settings; OCR_CHECKPOINTS=false disables it"""
+    if os.getenv("OCR_CHECKPOINTS", "true").lower() not in ("1", "true", "yes"):
+        return None
+    return OCRCheckpointStore(
+        os.getenv("OCR_CHECKPOINT_URL", "sqlite:///./ocr_checkpoints.db"),
+        ttl_seconds=float(os.getenv("OCR_CHECKPOINT_TTL_SECONDS", str(7 * 24 * 3600))),
+    )
@@ -0,0 +1,193 @@
+"""
+Process-wide OCR Executor
+Runs blocking Vision / pdfplumber / poppler work off the event loop
+on a bounded, size-configurable thread pool.
+"""
+import os
+import asyncio
+import logging
+import threading
+import functools
+from collections import deque
+from typing import Dict, Any, Callable, AsyncIterator, Deque, Hashable, Iterator, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger("indic-scribe.ocr-executor")
+
+
+class OCRExecutorBusy(Exception):
+    """Raised when the executor queue is full and new work is rejected"""
+
+
+class OCRExecutor:
+    """
+    Thread pool with a bounded backlog and fair admission.
+    At most `max_workers` documents are processed at once; up to `max_queue`
+    more may wait. Anything beyond that is rejected with OCRExecutorBusy.
+    Waiting work is queued per owner (the user) and admitted round robin, and no owner
+    may hold more than `max_per_owner` workers, so one user's long documents or streams
+    can't take every worker while others wait.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 256, max_per_owner: Optional[int] = None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_owner = max(1, max_per_owner if max_per_owner is not None else max_workers // 2)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr")
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, Deque[Tuple[Future, Callable]]] = {}
+        self._turns: Deque[Hashable] = deque()  # Owners with pending work, in round-robin order
+        self._running_by_owner: Dict[Hashable, int] = {}
+        self._queued = 0
+        self._running = 0
+
+    def submit(self, fn: Callable, *args, owner: Optional[Hashable] = None, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) on behalf of `owner` (default: an owner of its own)"""
+        owner = owner if owner is not None else object()
+        future: Future = Future()
+        with self._lock:
+            if self._queued >= self.max_queue:
+                raise OCRExecutorBusy(f"OCR queue is full ({self._queued} waiting)")
+            self._queued += 1
+            if owner not in self._pending:
+                self._pending[owner] = deque()
+                self._turns.append(owner)
+            self._pending[owner].append((future, functools.partial(fn, *args, **kwargs)))
+            self._dispatch_locked()
+        return future
+
+    def _dispatch_locked(self) -> None:
+        """Start queued work while workers are free, taking owners in turn"""
+        skipped = 0
+        while self._running < self.max_workers and skipped < len(self._turns):
+            owner = self._turns.popleft()
+            if self._running_by_owner.get(owner, 0) >= self.max_per_owner:
+                self._turns.append(owner)
+                skipped += 1
+                continue
+            skipped = 0
+            tasks = self._pending[owner]
+            future, call = tasks.popleft()
+            if tasks:
+                self._turns.append(owner)
+            else:
+                del self._pending[owner]
+            self._queued -= 1
+            if not future.set_running_or_notify_cancel():
+                continue  # Cancelled while queued
+            self._running += 1
+            self._running_by_owner[owner] = self._running_by_owner.get(owner, 0) + 1
+            self._executor.submit(self._work, owner, future, call)
+
+    def _work(self, owner: Hashable, future: Future, call: Callable) -> None:
+        try:
+            future.set_result(call())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._running_by_owner[owner] -= 1
+                if not self._running_by_owner[owner]:
+                    del self._running_by_owner[owner]
+                self._dispatch_locked()
+
+    async def run(self, fn: Callable, *args, owner: Optional[Hashable] = None, **kwargs) -> Any:
+        """Await a blocking call on the pool without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, owner=owner, **kwargs))
+
+    async def stream(
+        self,
+        fn: Callable[..., Iterator],
+        *args,
+        max_buffered: int = 4,
+        stop: Optional[threading.Event] = None,
+        owner: Optional[Hashable] = None,
+        on_finish: Optional[Callable[[], None]] = None,
+        **kwargs,
+    ) -> AsyncIterator:
+        """
+        Run a blocking generator on the pool and re-yield its items on the event loop.
+        At most `max_buffered` items are held between producer and consumer; if the
+        consumer stops early, the generator is closed at its next yield.
+        Pass `stop` to learn about that sooner: it is set as soon as the consumer goes away,
+        so a generator that watches it can stop without waiting for its next item.
+        The generator holds one of `owner`'s workers until it finishes.
+        `on_finish` is called once the generator has been closed (or could not be started), e.g. to
+        delete its input file; the consumer going away doesn't mean the pipeline has stopped using it.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+        stop = stop if stop is not None else threading.Event()
+        end = object()
+
+        def put(item) -> bool:
+            if stop.is_set() or loop.is_closed():
+                return False
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=0.5)
+                    return True
+                except FutureTimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        def produce():
+            iterator = fn(*args, **kwargs)
+            try:
+                for item in iterator:
+                    if stop.is_set() or not put((item, None)):
+                        break
+            except Exception as e:
+                put((end, e))
+                return
+            finally:
+                try:
+                    iterator.close()
+                finally:
+                    if on_finish:
+                        on_finish()
+            put((end, None))
+
+        try:
+            self.submit(produce, owner=owner)
+        except BaseException:
+            if on_finish:
+                on_finish()
+            raise
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is end:
+                    if error:
+                        raise error
+                    break
+                yield item
+        finally:
+            stop.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_per_owner": self.max_per_owner,
+                "owners": len(set(self._pending) | set(self._running_by_owner)),
+                "running": self._running,
+                "queued": self._queued,
+                "max_queue": self.max_queue,
+            }
+
+
+_ocr_executor = None
+
+def get_ocr_executor() -> OCRExecutor:
+    global _ocr_executor
+    if _ocr_executor is None:
+        _ocr_executor = OCRExecutor(
+            max_workers=int(os.getenv("OCR_EXECUTOR_WORKERS", "4")),
+            max_queue=int(os.getenv("OCR_EXECUTOR_MAX_QUEUE", "256")),
+            max_per_owner=int(os.getenv("OCR_EXECUTOR_MAX_PER_USER", "0")) or None,
+        )
+    return _ocr_executor
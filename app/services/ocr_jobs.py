@@ -0,0 +1,274 @@
+"""
+OCR Job Manager
+Runs OCR work in the background and tracks progress by job ID,
+so long documents don't hold an HTTP connection open. Job state is kept in
+the app database so any server worker can answer a poll.
+"""
+import os
+import logging
+import threading
+import time
+import uuid
+from typing import Optional, Dict, Any, Callable
+
+from app.database import SessionLocal, OCRJobRecord
+from app.services.ocr_executor import OCRExecutor, get_ocr_executor
+
+logger = logging.getLogger("indic-scribe.ocr-jobs")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class OCRJob:
+    """State of a single background OCR job"""
+
+    def __init__(self, owner_id: int, filename: str, job_id: Optional[str] = None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.filename = filename
+        self.status = JOB_QUEUED
+        self.pages_done = 0
+        self.pages_total: Optional[int] = None
+        self.text: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update_progress(self, pages_done: int, pages_total: int) -> None:
+        """Progress callback handed to VisionService"""
+        with self._lock:
+            self.pages_done = pages_done
+            self.pages_total = pages_total
+
+    @classmethod
+    def from_record(cls, record: OCRJobRecord) -> "OCRJob":
+        job = cls(record.owner_id, record.filename, job_id=record.job_id)
+        job.status = record.status
+        job.pages_done = record.pages_done or 0
+        job.pages_total = record.pages_total
+        job.text = record.text
+        job.error = record.error
+        job.created_at = record.created_at
+        job.started_at = record.started_at
+        job.finished_at = record.finished_at
+        return job
+
+    def to_record(self) -> OCRJobRecord:
+        with self._lock:
+            return OCRJobRecord(
+                job_id=self.job_id,
+                owner_id=self.owner_id,
+                filename=self.filename,
+                status=self.status,
+                pages_done=self.pages_done,
+                pages_total=self.pages_total,
+                text=self.text,
+                error=self.error,
+                created_at=self.created_at,
+                started_at=self.started_at,
+                finished_at=self.finished_at,
+                updated_at=time.time(),
+            )
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            processing_time = None
+            if self.started_at and self.finished_at:
+                processing_time = self.finished_at - self.started_at
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "filename": self.filename,
+                "pages_done": self.pages_done,
+                "pages_total": self.pages_total,
+                "text": self.text if self.status == JOB_COMPLETED else None,
+                "error": self.error,
+                "processing_time_seconds": processing_time,
+            }
+
+
+class OCRJobManager:
+    """
+    Runs OCR jobs on the shared OCR executor and records their state in the database.
+    Jobs running in this process are written back every `sync_seconds` (progress plus a heartbeat),
+    and on every status change. A queued or running job whose heartbeat is older than
+    `stale_seconds` belonged to a worker that went away and is reported as failed.
+    Finished jobs are kept for `job_ttl_seconds` so clients can collect results.
+    """
+
+    def __init__(
+        self,
+        executor: OCRExecutor,
+        job_ttl_seconds: int = 3600,
+        sync_seconds: float = 2.0,
+        stale_seconds: float = 60.0,
+    ):
+        self.job_ttl_seconds = job_ttl_seconds
+        self.sync_seconds = sync_seconds
+        self.stale_seconds = stale_seconds
+        self._executor = executor
+        self._jobs: Dict[str, OCRJob] = {}  # Jobs owned by this process that haven't finished
+        self._lock = threading.Lock()
+        self._syncer: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        owner_id: int,
+        filename: str,
+        work: Callable[[OCRJob], str],
+        on_success: Optional[Callable[[OCRJob], None]] = None,
+        on_finish: Optional[Callable[[OCRJob], None]] = None,
+    ) -> OCRJob:
+        """
+        Register a job and schedule `work(job)` on the pool.
+        Raises OCRExecutorBusy if the executor backlog is full.
+
+        Args:
+            owner_id: ID of the user who owns the job
+            filename: Original upload name (informational)
+            work: Callable returning the extracted text; may call job.update_progress.
+                  Raising marks the job failed.
+            on_success: Called after the job completed successfully (e.g. deduct credits)
+            on_finish: Always called once the job is done (e.g. temp file cleanup)
+        """
+        self._evict_expired()
+        job = OCRJob(owner_id, filename)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._save(job)
+        try:
+            self._executor.submit(self._run, job, work, on_success, on_finish, owner=owner_id)
+        except Exception:
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            self._delete(job.job_id)
+            raise
+        self._start_syncer()
+        logger.info(f"OCR job {job.job_id} queued for user {owner_id} ({filename})")
+        return job
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job:
+            return job
+
+        db = SessionLocal()
+        try:
+            record = db.query(OCRJobRecord).filter(OCRJobRecord.job_id == job_id).first()
+        finally:
+            db.close()
+        if not record:
+            return None
+        job = OCRJob.from_record(record)
+        if not job.is_finished and (record.updated_at or 0) < time.time() - self.stale_seconds:
+            job.status = JOB_FAILED
+            job.error = "Job was interrupted by a server restart"
+        return job
+
+    def _run(self, job: OCRJob, work, on_success, on_finish) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            text = work(job)
+            job.text = text or ""
+            job.status = JOB_COMPLETED
+            logger.info(f"✓ OCR job {job.job_id} completed in {time.time() - job.started_at:.2f}s")
+        except Exception as e:
+            logger.error(f"✗ OCR job {job.job_id} failed: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = JOB_FAILED
+        job.finished_at = time.time()
+        self._save(job)
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+
+        if job.status == JOB_COMPLETED and on_success:
+            try:
+                on_success(job)
+            except Exception as e:
+                logger.error(f"OCR job {job.job_id} success hook failed: {e}", exc_info=True)
+        if on_finish:
+            try:
+                on_finish(job)
+            except Exception as e:
+                logger.error(f"OCR job {job.job_id} cleanup hook failed: {e}", exc_info=True)
+
+    def _save(self, job: OCRJob) -> None:
+        db = SessionLocal()
+        try:
+            db.merge(job.to_record())
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not save OCR job {job.job_id}: {e}")
+        finally:
+            db.close()
+
+    def _delete(self, job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(OCRJobRecord).filter(OCRJobRecord.job_id == job_id).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not delete OCR job {job_id}: {e}")
+        finally:
+            db.close()
+
+    def _start_syncer(self) -> None:
+        with self._lock:
+            if self._syncer is None:
+                self._syncer = threading.Thread(target=self._sync_loop, name="ocr-job-sync", daemon=True)
+                self._syncer.start()
+
+    def _sync_loop(self) -> None:
+        """Write progress and heartbeats of this process's unfinished jobs"""
+        while True:
+            time.sleep(self.sync_seconds)
+            with self._lock:
+                live = list(self._jobs.values())
+            for job in live:
+                if not job.is_finished:
+                    self._save(job)
+
+    def _evict_expired(self) -> None:
+        """Drop finished jobs whose results have outlived the TTL"""
+        cutoff = time.time() - self.job_ttl_seconds
+        db = SessionLocal()
+        try:
+            expired = db.query(OCRJobRecord).filter(
+                OCRJobRecord.finished_at.isnot(None), OCRJobRecord.finished_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"OCR job eviction failed: {e}")
+            return
+        finally:
+            db.close()
+        if expired:
+            logger.info(f"Evicted {expired} expired OCR jobs")
+
+
+_job_manager = None
+
+def get_job_manager() -> OCRJobManager:
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = OCRJobManager(
+            get_ocr_executor(),
+            job_ttl_seconds=int(os.getenv("OCR_JOB_TTL_SECONDS", "3600")),
+            stale_seconds=float(os.getenv("OCR_JOB_STALE_SECONDS", "60")),
+        )
+    return _job_manager
@@ -0,0 +1,121 @@
+"""
+PDF Text-Layer Extraction
+Extracts embedded text with pdfplumber across worker processes. pdfminer is
+pure Python and GIL-bound, so threads barely overlap; each worker process
+instead opens the document once and extracts a contiguous shard of pages.
+"""
+import os
+import logging
+import multiprocessing
+import threading
+from typing import List, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+
+def extract_page_shard(pdf_path: str, page_nums: List[int]) -> List[Tuple[int, Optional[str]]]:
+    """
+    Open the PDF once and extract the text layer of each page in `page_nums`.
+    Returns (page_num, text) pairs; text is None for pages that could not be extracted.
+    Top-level so it can run in a worker process.
+    """
+    results: List[Tuple[int, Optional[str]]] = []
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_num in page_nums:
+                try:
+                    page = pdf.pages[page_num - 1]
+                    results.append((page_num, page.extract_text() or ""))
+                    # Release the parsed layout so long shards don't accumulate it
+                    page.close()
+                except Exception as e:
+                    logger.error(f"Error extracting page {page_num}: {e}")
+                    results.append((page_num, None))
+    except Exception as e:
+        logger.error(f"Direct extraction error: {e}")
+        done = {num for num, _ in results}
+        results.extend((num, None) for num in page_nums if num not in done)
+    return results
+
+
+def split_shards(page_nums: List[int], shard_count: int) -> List[List[int]]:
+    """Split page numbers into `shard_count` contiguous shards of near-equal size"""
+    shard_count = max(1, min(shard_count, len(page_nums)))
+    size, extra = divmod(len(page_nums), shard_count)
+    shards, start = [], 0
+    for i in range(shard_count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(page_nums[start:end])
+        start = end
+    return shards
+
+
+class PDFTextExtractor:
+    """
+    Runs text-layer extraction on a long-lived process pool.
+    Ranges shorter than two shards are extracted in the calling thread,
+    where process start-up and pickling would cost more than they save.
+    """
+
+    def __init__(self, processes: int = 1, min_shard_pages: int = 8):
+        self.processes = max(1, processes)
+        self.min_shard_pages = max(1, min_shard_pages)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: forking a process that already runs gRPC and worker threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Shut down a broken pool; the next extraction starts a fresh one"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract(self, pdf_path: str, page_nums: List[int]) -> List[Tuple[int, Optional[str]]]:
+        """Extract the given pages, returning (page_num, text) pairs sorted by page"""
+        shard_count = min(self.processes, len(page_nums) // self.min_shard_pages)
+        if shard_count < 2:
+            return extract_page_shard(pdf_path, page_nums)
+
+        pool = self._get_pool()
+        results: List[Tuple[int, Optional[str]]] = []
+        try:
+            futures = [(shard, pool.submit(extract_page_shard, pdf_path, shard))
+                       for shard in split_shards(page_nums, shard_count)]
+        except BrokenProcessPool as e:
+            logger.error(f"Extraction pool is broken ({e}); extracting in-process")
+            self._discard_pool(pool)
+            return extract_page_shard(pdf_path, page_nums)
+
+        for shard, future in futures:
+            try:
+                results.extend(future.result())
+            except BrokenProcessPool as e:
+                logger.error(f"Extraction worker died ({e}); extracting pages {shard[0]}-{shard[-1]} in-process")
+                self._discard_pool(pool)
+                results.extend(extract_page_shard(pdf_path, shard))
+        results.sort(key=lambda x: x[0])
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_text_extractor() -> PDFTextExtractor:
+    """Build the extractor from environment settings (PDF_EXTRACT_PROCESSES, default: CPU count)"""
+    return PDFTextExtractor(processes=int(os.getenv("PDF_EXTRACT_PROCESSES", str(os.cpu_count() or 1))))
@@ -0,0 +1,145 @@
+"""
+Text-Layer Quality Classifier
+Decides whether text extracted from a PDF's text layer is usable or is
+broken-encoding garbage that needs Vision OCR instead.
+
+Every codepoint is mapped to a character class through a precomputed
+lookup table, so classifying a page is one C-level str.translate pass
+plus a few str.count calls instead of several Python-level loops.
+"""
+import sys
+import math
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Class markers. They are all control characters, and every control character
+# in the input is itself mapped to a marker, so after translation a marker can
+# only have come from the table. Some codepoints belong to two classes
+# (e.g. "²" is both Latin-1 Supplement and a digit), hence the combined markers.
+_CONTROL = "\x01"           # C0 controls other than \n \r \t
+_EXTENDED = "\x02"          # Latin-1 Supplement (U+0080-U+00FF): typical broken-mapping artifacts
+_EXTENDED_ENGLISH = "\x03"  # ... that also count as English-like (superscript digits)
+_INDIC = "\x04"             # Devanagari to Sinhala blocks (U+0900-U+0DFF)
+_INDIC_ENGLISH = "\x05"     # ... that also count as English-like (Indic digits)
+_ENGLISH = "\x06"           # ASCII letters/digits, common punctuation and whitespace
+
+_ENGLISH_PUNCTUATION = " .,?!-\n\r\t"
+
+# Thresholds (percent of all characters unless noted)
+MAX_CID_PERCENT = 1
+MAX_EXTENDED_LATIN_PERCENT = 2
+MAX_CONTROL_PERCENT = 2
+MIN_ENGLISH_RATIO = 0.7  # Only enforced when there is no Indic text at all
+
+_table: Optional[Dict[int, str]] = None
+_table_lock = threading.Lock()
+
+
+def _is_english_like(char: str) -> bool:
+    return 'a' <= char.lower() <= 'z' or char.isdigit() or char in _ENGLISH_PUNCTUATION
+
+
+def _build_class_table() -> Dict[int, str]:
+    table: Dict[int, str] = {}
+    for cp in range(sys.maxunicode + 1):
+        char = chr(cp)
+        english = _is_english_like(char)
+        if cp < 32 and char not in '\n\r\t ':
+            table[cp] = _CONTROL
+        elif 128 <= cp <= 255:
+            table[cp] = _EXTENDED_ENGLISH if english else _EXTENDED
+        elif 0x0900 <= cp <= 0x0DFF:
+            table[cp] = _INDIC_ENGLISH if english else _INDIC
+        elif english:
+            table[cp] = _ENGLISH
+    return table
+
+
+def _class_table() -> Dict[int, str]:
+    """Built on first use (a few hundred ms) rather than at import"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = _build_class_table()
+    return _table
+
+
+def assess_text_quality(text: str) -> Tuple[bool, str]:
+    """
+    Evaluate if extracted text is of acceptable quality.
+    Detects broken PDF encodings, CID garbage, and encoding artifacts.
+    Returns (ok, reason) where reason explains a failure.
+    """
+    if not text or len(text.strip()) < 5:
+        return False, "too little text"
+
+    total_len = len(text)
+
+    # 1. Detect CID-encoded garbage (common in broken PDFs)
+    cid_count = text.count('(cid:')
+    if (cid_count / total_len) * 100 > MAX_CID_PERCENT:
+        return False, f"high CID count ({cid_count})"
+
+    classes = text.translate(_class_table())
+    extended_english = classes.count(_EXTENDED_ENGLISH)
+    indic_english = classes.count(_INDIC_ENGLISH)
+    extended_latin_count = classes.count(_EXTENDED) + extended_english
+    indic_char_count = classes.count(_INDIC) + indic_english
+    control_chars = classes.count(_CONTROL)
+
+    # 2. Detect Encoding Artifacts (Latin-1 Supplement characters used as garbage).
+    # In Indic PDF extraction, these are almost always garbage mapping artifacts.
+    if (extended_latin_count / total_len) * 100 > MAX_EXTENDED_LATIN_PERCENT:
+        return False, f"high extended latin count ({extended_latin_count})"
+
+    if (control_chars / total_len) * 100 > MAX_CONTROL_PERCENT:
+        return False, f"high control character count ({control_chars})"
+
+    # 3. Script Coherence Check: text that is neither English-like nor Indic
+    # is most likely a broken mapping of an Indic script.
+    if indic_char_count == 0:
+        english_ratio = (classes.count(_ENGLISH) + extended_english + indic_english) / total_len
+        if english_ratio < MIN_ENGLISH_RATIO:
+            return False, f"script coherence (English Ratio: {english_ratio:.2f}, Indic Chars: 0)"
+
+    return True, ""
+
+
+def is_text_quality_good(text: str) -> bool:
+    ok, reason = assess_text_quality(text)
+    if not ok:
+        logger.info(f"Quality Check: Failed due to {reason}")
+    return ok
+
+
+def sample_size(population: int, margin: float = 0.15, z: float = 1.96, proportion: float = 0.5) -> int:
+    """
+    Pages to inspect to estimate a proportion (e.g. of garbage pages) within `margin`
+    at the confidence implied by `z` (1.96 = 95%), using Cochran's formula with the
+    finite-population correction. The worst case proportion 0.5 is assumed by default.
+    """
+    if population <= 0:
+        return 0
+    n0 = (z ** 2) * proportion * (1 - proportion) / (margin ** 2)
+    return min(population, math.ceil(n0 / (1 + (n0 - 1) / population)))
+
+
+def sample_evenly(items: List[T], count: int) -> List[T]:
+    """Pick `count` items spread evenly across the list (stratified, deterministic)"""
+    if count >= len(items):
+        return list(items)
+    if count <= 0:
+        return []
+    step = len(items) / count
+    return [items[int(i * step + step / 2)] for i in range(count)]
+
+
+def sample_pages(page_nums: List[int], margin: float = 0.15) -> List[int]:
+    """Statistically sized, evenly spread sample of pages for judging a whole document's text layer"""
+    return sample_evenly(page_nums, sample_size(len(page_nums), margin=margin))
@@ -0,0 +1,142 @@
+"""
+Hedged Vision Requests
+When a Vision call runs longer than the observed p95 for that kind of call,
+a duplicate is sent and whichever answers first wins. A token budget keeps
+hedges to a fixed share of traffic so they can't amplify an overload.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    """Recent latencies of one kind of call, with a cached quantile"""
+
+    def __init__(self, size: int = 500):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self._cached: Optional[float] = None
+        self._since_refresh = 0
+
+    def add(self, latency: float) -> None:
+        self.samples.append(latency)
+        self._since_refresh += 1
+
+    def quantile(self, q: float, min_samples: int) -> Optional[float]:
+        if len(self.samples) < min_samples:
+            return None
+        # Sorting a few hundred floats is cheap, but there is no need to do it on every call
+        if self._cached is None or self._since_refresh >= 25:
+            ordered = sorted(self.samples)
+            self._cached = ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            self._since_refresh = 0
+        return self._cached
+
+
+class RequestHedger:
+    """
+    Runs calls with a hedge: if the first attempt hasn't returned after the `quantile` latency
+    of its kind, a second identical call is started and the first successful result is used.
+    Every call earns `budget_percent`/100 of a token and a hedge spends one, so hedges stay
+    under that share of traffic over time.
+    """
+
+    def __init__(
+        self,
+        budget_percent: float = 5.0,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        max_workers: int = 64,
+    ):
+        self.budget = budget_percent / 100
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vision-hedge")
+        self._lock = threading.Lock()
+        self._windows: Dict[str, LatencyWindow] = {}
+        self._tokens = 0.0
+        self._max_tokens = 10.0
+        self._calls = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._budget_denied = 0
+
+    def call(self, key: str, fn: Callable[[float], T], timeout: float) -> T:
+        """Run `fn(timeout)`, hedging it if it outlives the usual latency for `key`"""
+        with self._lock:
+            self._calls += 1
+            self._tokens = min(self._max_tokens, self._tokens + self.budget)
+            window = self._windows.setdefault(key, LatencyWindow())
+            delay = window.quantile(self.quantile, self.min_samples)
+
+        start = time.monotonic()
+        if delay is None or delay >= timeout:
+            # Not enough history yet (or the call would time out first): run it plainly
+            result = fn(timeout)
+            self._record(window, time.monotonic() - start)
+            return result
+
+        primary = self._executor.submit(fn, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_token():
+            result = primary.result()
+            self._record(window, time.monotonic() - start)
+            return result
+
+        hedge = self._executor.submit(fn, max(0.001, timeout - (time.monotonic() - start)))
+        pending = {primary, hedge}
+        errors: Dict[Future, BaseException] = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    errors[future] = error
+                    continue
+                self._record(window, time.monotonic() - start)
+                if future is hedge:
+                    with self._lock:
+                        self._hedge_wins += 1
+                # The slower call finishes in the background and its result is dropped
+                return future.result()
+        raise errors.get(primary) or errors[hedge]
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                self._budget_denied += 1
+                return False
+            self._tokens -= 1.0
+            self._hedges += 1
+            return True
+
+    def _record(self, window: LatencyWindow, latency: float) -> None:
+        with self._lock:
+            window.add(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            thresholds = {key: window.quantile(self.quantile, self.min_samples) for key, window in self._windows.items()}
+            return {
+                "budget_percent": round(self.budget * 100, 2),
+                "calls": self._calls,
+                "hedges": self._hedges,
+                "hedge_wins": self._hedge_wins,
+                "budget_denied": self._budget_denied,
+                "hedge_after_ms": {key: round(q * 1000, 1) for key, q in thresholds.items() if q is not None},
+            }
+
+
+def create_request_hedger() -> Optional[RequestHedger]:
+    """Build the hedger from environment settings; VISION_HEDGE_PERCENT=0 (default) disables hedging"""
+    budget = float(os.getenv("VISION_HEDGE_PERCENT", "0"))
+    if budget <= 0:
+        return None
+    return RequestHedger(budget_percent=budget, quantile=float(os.getenv("VISION_HEDGE_QUANTILE", "0.95")))
@@ -0,0 +1,404 @@
+"""
+Shared Vision Worker Pool
+One long-lived thread pool for page-level OCR work across all requests, and an
+adaptive limiter on Vision RPCs in flight across the whole process. Requests no
+longer spin up their own executors, so concurrent uploads share a fixed number
+of threads, and the limiter tunes how hard they push on Vision. The pool serves
+users fairly, so small requests aren't stuck behind large documents.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, List, Optional
+
+from google.api_core import exceptions as gexc
+
+from app.services.vision_retry import OCRCancelled, OCRDeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+# google.rpc.Code values Vision reports for overload: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, UNAVAILABLE
+OVERLOAD_STATUS_CODES = {4, 8, 14}
+OVERLOAD_EXCEPTIONS = (
+    gexc.DeadlineExceeded,
+    gexc.ResourceExhausted,
+    gexc.ServiceUnavailable,
+    gexc.TooManyRequests,
+)
+
+
+class VisionCallLimiter:
+    """
+    Caps the number of Vision RPCs in flight across all requests, adapting the cap with AIMD.
+    While the limit is saturated and per-image latency stays close to its long-run level, the limit
+    grows by about one per round of `limit` successful calls; an overload error (quota, deadline,
+    unavailable) halves it, at most once per cooldown. With min_limit == max_limit it is a fixed cap.
+    Callers wrap each RPC in `with limiter.slot(images, flow):`. When calls have to wait, freed slots
+    go to waiting flows in turn (FIFO within a flow), so a user with one page isn't queued behind
+    every RPC of another user's large documents.
+    """
+
+    def __init__(
+        self,
+        limit: int = 16,
+        min_limit: Optional[int] = None,
+        max_limit: Optional[int] = None,
+        backoff: float = 0.5,
+        latency_tolerance: float = 1.5,
+        cooldown_seconds: float = 2.0,
+        baseline_window: float = 60.0,
+    ):
+        self.min_limit = max(1, min_limit if min_limit is not None else limit)
+        self.max_limit = max(self.min_limit, max_limit if max_limit is not None else limit)
+        self._limit = float(min(max(limit, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        # How much slower than usual recent calls may be before the limit stops growing
+        self.latency_tolerance = latency_tolerance
+        self.cooldown_seconds = cooldown_seconds
+        self.baseline_window = baseline_window
+
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._waiting = 0
+        # Waiting calls per flow (a one-item list, set to [True] when granted a slot) and the turn order
+        self._waiters: Dict[Hashable, Deque[List[bool]]] = {}
+        self._turns: Deque[Hashable] = deque()
+        self._calls = 0
+        self._errors = 0
+        self._overloads = 0
+        self._increases = 0
+        self._decreases = 0
+        self._last_decrease = 0.0
+        # Per-image latency: short EWMA follows current conditions, long-run baseline is the reference
+        self._latency_short = 0.0
+        self._latency_long = 0.0
+        self._last_sample = 0.0
+
+    @property
+    def adaptive(self) -> bool:
+        return self.max_limit > self.min_limit
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @contextmanager
+    def slot(
+        self,
+        weight: int = 1,
+        flow: Optional[Hashable] = None,
+        deadline: Optional[float] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[None]:
+        """
+        Hold one RPC slot for the duration of a call covering `weight` images, on behalf of `flow`.
+        A call still waiting for a slot at `deadline` (a time.monotonic() value) raises
+        OCRDeadlineExceeded, and one whose `cancel_event` is set raises OCRCancelled.
+        """
+        with self._cond:
+            if self._turns or self._inflight >= int(self._limit):
+                flow = flow if flow is not None else object()
+                granted = [False]
+                if flow not in self._waiters:
+                    self._waiters[flow] = deque()
+                    self._turns.append(flow)
+                self._waiters[flow].append(granted)
+                self._waiting += 1
+                self._grant_locked()
+                try:
+                    while not granted[0]:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise OCRCancelled("Vision call cancelled while waiting for a slot")
+                        timeout = None
+                        if deadline is not None:
+                            timeout = deadline - time.monotonic()
+                            if timeout <= 0:
+                                raise OCRDeadlineExceeded("Vision call: deadline exceeded while waiting for a slot")
+                        if cancel_event is not None:
+                            timeout = min(timeout, 0.5) if timeout is not None else 0.5
+                        self._cond.wait(timeout)
+                except BaseException:
+                    self._withdraw_locked(flow, granted)
+                    raise
+                finally:
+                    self._waiting -= 1
+            else:
+                self._inflight += 1
+
+        start = time.monotonic()
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release((time.monotonic() - start) / max(1, weight), error)
+
+    def _release(self, latency: float, error: Optional[BaseException]) -> None:
+        with self._cond:
+            saturated = self._inflight >= int(self._limit)
+            self._inflight -= 1
+            self._calls += 1
+            if error is None:
+                self._record_latency(latency)
+                if saturated:
+                    self._increase()
+            else:
+                self._errors += 1
+                if isinstance(error, OVERLOAD_EXCEPTIONS):
+                    self._on_overload_locked()
+            self._grant_locked()
+
+    def _grant_locked(self) -> None:
+        """Hand free slots to waiting calls, one flow at a time"""
+        granted = False
+        while self._turns and self._inflight < int(self._limit):
+            flow = self._turns.popleft()
+            waiters = self._waiters[flow]
+            waiters.popleft()[0] = True
+            self._inflight += 1
+            granted = True
+            if waiters:
+                self._turns.append(flow)
+            else:
+                del self._waiters[flow]
+        if granted:
+            self._cond.notify_all()
+
+    def _withdraw_locked(self, flow: Hashable, granted: List[bool]) -> None:
+        """Take a call that gave up waiting out of its flow's queue, or hand back a slot it was just granted"""
+        if granted[0]:
+            self._inflight -= 1
+            self._grant_locked()
+            return
+        waiters = self._waiters[flow]
+        waiters.remove(granted)
+        if not waiters:
+            del self._waiters[flow]
+            self._turns.remove(flow)
+
+    def record_overload(self) -> None:
+        """Report an overload that arrived inside a successful RPC (e.g. a failed batch slot)"""
+        with self._cond:
+            self._on_overload_locked()
+
+    def _record_latency(self, latency: float) -> None:
+        if self._latency_long == 0.0:
+            self._latency_short = self._latency_long = latency
+            self._last_sample = time.monotonic()
+            return
+        self._latency_short = 0.8 * self._latency_short + 0.2 * latency
+        # The baseline follows improvements quickly but rises only over `baseline_window` seconds,
+        # so it tracks the unloaded latency rather than whatever the current concurrency produces
+        now = time.monotonic()
+        elapsed, self._last_sample = now - self._last_sample, now
+        weight = 0.1 if latency < self._latency_long else min(1.0, elapsed / self.baseline_window)
+        self._latency_long += weight * (latency - self._latency_long)
+
+    def _increase(self) -> None:
+        if not self.adaptive or self._limit >= self.max_limit:
+            return
+        if self._latency_short > self._latency_long * self.latency_tolerance:
+            return  # Latency is climbing: more concurrency would only queue at Vision
+        before = int(self._limit)
+        self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+        if int(self._limit) > before:
+            self._increases += 1
+
+    def _on_overload_locked(self) -> None:
+        self._overloads += 1
+        now = time.monotonic()
+        # A burst of concurrent failures is one congestion event, not many
+        if not self.adaptive or now - self._last_decrease < self.cooldown_seconds:
+            return
+        self._last_decrease = now
+        before = int(self._limit)
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        self._decreases += 1
+        logger.warning(f"Vision overload: concurrency limit {before} -> {int(self._limit)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": int(self._limit),
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "in_flight": self._inflight,
+                "waiting": self._waiting,
+                "calls": self._calls,
+                "errors": self._errors,
+                "overloads": self._overloads,
+                "limit_increases": self._increases,
+                "limit_decreases": self._decreases,
+                "latency_ms_per_image": round(self._latency_short * 1000, 1),
+                "baseline_latency_ms_per_image": round(self._latency_long * 1000, 1),
+            }
+
+
+class _PageTask:
+    __slots__ = ("future", "fn", "args", "kwargs", "cost")
+
+    def __init__(self, future: Future, fn: Callable, args: tuple, kwargs: dict, cost: int):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cost = cost
+
+
+class OCRWorkerPool:
+    """
+    Process-wide thread pool for page OCR tasks (image reading, preprocessing, Vision calls).
+    Tasks are queued per flow (a user, or a single request) and served by deficit round robin:
+    each flow earns `quantum` pages per round and a task costs the pages it covers, so a large
+    document can't make a one-page request wait behind its whole backlog. Each request's pipeline
+    also bounds how many of its pages are outstanding.
+    """
+
+    def __init__(self, max_workers: int = 32, quantum: int = 4):
+        self.max_workers = max(1, max_workers)
+        self.quantum = max(1, quantum)
+        self._cond = threading.Condition()
+        self._flows: Dict[Hashable, Deque[_PageTask]] = {}
+        self._deficit: Dict[Hashable, int] = {}
+        self._round: Deque[Hashable] = deque()  # Flows with queued tasks, in service order
+        self._threads: List[threading.Thread] = []
+        self._idle = 0
+        self._shutdown = False
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+
+    def submit(self, fn: Callable, *args, flow: Optional[Hashable] = None, cost: int = 1, **kwargs) -> Future:
+        """
+        Queue `fn(*args, **kwargs)` for `flow` (tasks without one each form their own flow);
+        `cost` is the number of pages the task covers.
+        """
+        future: Future = Future()
+        task = _PageTask(future, fn, args, kwargs, max(1, cost))
+        flow = flow if flow is not None else object()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("OCR worker pool is shut down")
+            if flow not in self._flows:
+                self._flows[flow] = deque()
+                self._deficit[flow] = 0
+                self._round.append(flow)
+            self._flows[flow].append(task)
+            self._queued += 1
+            if self._idle == 0 and len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, name=f"vision-ocr-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def _next_task(self) -> Optional[_PageTask]:
+        """Deficit round robin over flows with queued work; call with the lock held"""
+        while self._round:
+            flow = self._round[0]
+            tasks = self._flows[flow]
+            # Tasks cancelled while queued leave without using the flow's share
+            while tasks and tasks[0].future.cancelled():
+                tasks.popleft()
+                self._queued -= 1
+                self._cancelled += 1
+            if not tasks:
+                self._drop_flow(flow)
+                continue
+            if self._deficit[flow] < tasks[0].cost:
+                # Out of credit this round: top up and let the next flow go
+                self._deficit[flow] += self.quantum
+                self._round.rotate(-1)
+                continue
+            task = tasks.popleft()
+            self._deficit[flow] -= task.cost
+            self._queued -= 1
+            if not tasks:
+                self._drop_flow(flow)
+            return task
+        return None
+
+    def _drop_flow(self, flow: Hashable) -> None:
+        # An idle flow doesn't bank credit for later
+        del self._flows[flow]
+        del self._deficit[flow]
+        self._round.remove(flow)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                task = self._next_task()
+                while task is None:
+                    if self._shutdown:
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                    task = self._next_task()
+                if not task.future.set_running_or_notify_cancel():
+                    self._cancelled += 1
+                    continue
+                self._running += 1
+
+            try:
+                result = task.fn(*task.args, **task.kwargs)
+            except BaseException as e:
+                task.future.set_exception(e)
+                with self._cond:
+                    self._failed += 1
+            else:
+                task.future.set_result(result)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "workers": self.max_workers,
+                "threads": len(self._threads),
+                "flows": len(self._flows),
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+            }
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._shutdown = True
+            for tasks in self._flows.values():
+                for task in tasks:
+                    task.future.cancel()
+            self._cond.notify_all()
+
+
+def create_worker_pool() -> OCRWorkerPool:
+    """Build the shared pool from environment settings (VISION_WORKERS, default 32; VISION_FAIR_QUANTUM pages, default 4)"""
+    return OCRWorkerPool(
+        max_workers=int(os.getenv("VISION_WORKERS", "32")),
+        quantum=int(os.getenv("VISION_FAIR_QUANTUM", "4")),
+    )
+
+
+def create_call_limiter() -> VisionCallLimiter:
+    """
+    Build the RPC limiter from environment settings: it starts at VISION_INITIAL_INFLIGHT (8) and
+    adapts between VISION_MIN_INFLIGHT (2) and VISION_MAX_INFLIGHT (32); equal bounds fix the limit.
+    """
+    return VisionCallLimiter(
+        limit=int(os.getenv("VISION_INITIAL_INFLIGHT", "8")),
+        min_limit=int(os.getenv("VISION_MIN_INFLIGHT", "2")),
+        max_limit=int(os.getenv("VISION_MAX_INFLIGHT", "32")),
+    )
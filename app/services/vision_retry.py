@@ -0,0 +1,129 @@
+"""
+Vision Retry Policy
+Retries transient Vision failures with exponential backoff and full jitter,
+within per-page and per-request deadlines, so one UNAVAILABLE or quota blip
+doesn't lose a page and a hung RPC can't hold a worker forever.
+"""
+import os
+import time
+import random
+import logging
+import threading
+from typing import Callable, Optional, TypeVar
+
+from google.api_core import exceptions as gexc
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# google.rpc.Code values worth retrying: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+TRANSIENT_STATUS_CODES = {4, 8, 10, 13, 14}
+TRANSIENT_EXCEPTIONS = (
+    gexc.DeadlineExceeded,
+    gexc.ResourceExhausted,
+    gexc.Aborted,
+    gexc.InternalServerError,
+    gexc.ServiceUnavailable,
+    gexc.TooManyRequests,
+    ConnectionError,
+)
+
+
+class VisionResponseError(RuntimeError):
+    """An error reported inside a Vision response (the RPC itself succeeded)"""
+
+    def __init__(self, message: str, code: int = 0):
+        super().__init__(f"Vision API error: {message}")
+        self.code = code
+
+
+class OCRDeadlineExceeded(TimeoutError):
+    """The page or request ran out of time before Vision produced a result"""
+
+
+class OCRCancelled(Exception):
+    """The request was cancelled (e.g. the client disconnected) before OCR finished"""
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, VisionResponseError):
+        return error.code in TRANSIENT_STATUS_CODES
+    return isinstance(error, TRANSIENT_EXCEPTIONS)
+
+
+class RetryPolicy:
+    """
+    Bounded retries with exponential backoff and full jitter.
+    Every attempt gets an RPC timeout capped by the remaining deadline, and no retry is
+    started (or slept towards) once the deadline would be missed.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        multiplier: float = 2.0,
+        rpc_timeout: float = 60.0,
+        page_timeout: float = 180.0,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        # Timeout for a single RPC attempt
+        self.rpc_timeout = rpc_timeout
+        # Total time one page (or batch of pages) may spend across all attempts
+        self.page_timeout = page_timeout
+
+    def backoff(self, attempt: int) -> float:
+        """Sleep before retry number `attempt` (1-based): uniform in [0, capped exponential]"""
+        return random.uniform(0, min(self.max_backoff, self.initial_backoff * self.multiplier ** (attempt - 1)))
+
+    def call(
+        self,
+        fn: Callable[[float], T],
+        deadline: Optional[float] = None,
+        what: str = "Vision call",
+        cancel_event: Optional[threading.Event] = None,
+    ) -> T:
+        """
+        Run `fn(timeout)` until it succeeds, fails permanently, runs out of attempts or
+        reaches `deadline` (a time.monotonic() value). Once `cancel_event` is set no further
+        attempt is made and OCRCancelled is raised.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            if cancel_event is not None and cancel_event.is_set():
+                raise OCRCancelled(f"{what}: cancelled")
+            timeout = self.rpc_timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OCRDeadlineExceeded(f"{what}: deadline exceeded after {attempt - 1} attempt(s)")
+                timeout = min(timeout, remaining)
+
+            try:
+                return fn(timeout)
+            except Exception as e:
+                if not is_transient(e) or attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                logger.warning(f"{what} failed ({e}), retry {attempt}/{self.max_attempts - 1} in {delay:.2f}s")
+                if cancel_event is not None:
+                    cancel_event.wait(delay)
+                else:
+                    time.sleep(delay)
+
+
+def create_retry_policy() -> RetryPolicy:
+    """Build the policy from environment settings"""
+    return RetryPolicy(
+        max_attempts=int(os.getenv("VISION_MAX_ATTEMPTS", "4")),
+        rpc_timeout=float(os.getenv("VISION_RPC_TIMEOUT_SECONDS", "60")),
+        page_timeout=float(os.getenv("VISION_PAGE_TIMEOUT_SECONDS", "180")),
+    )
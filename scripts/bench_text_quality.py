@@ -0,0 +1,105 @@
+"""
+Micro-benchmark for the text-layer quality classifier.
+
+Compares the previous multi-pass implementation of
+VisionService._is_text_quality_good with the table-driven classifier in
+app/services/text_quality.py, and checks both give the same verdicts.
+
+Usage: python scripts/bench_text_quality.py [pages] [chars_per_page]
+"""
+import sys
+import random
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.text_quality import _class_table, is_text_quality_good, sample_pages
+
+
+def legacy_is_text_quality_good(text: str) -> bool:
+    """The pre-rewrite implementation, minus logging"""
+    if not text or len(text.strip()) < 5:
+        return False
+    total_len = len(text)
+    cid_count = text.count('(cid:')
+    if (cid_count / total_len) * 100 > 1:
+        return False
+    extended_latin_count = 0
+    indic_char_count = 0
+    control_chars = 0
+    for char in text:
+        cp = ord(char)
+        if cp < 32 and char not in '\n\r\t ':
+            control_chars += 1
+        elif 128 <= cp <= 255:
+            extended_latin_count += 1
+        elif 0x0900 <= cp <= 0x0DFF:
+            indic_char_count += 1
+    if (extended_latin_count / total_len) * 100 > 2:
+        return False
+    if (control_chars / total_len) * 100 > 2:
+        return False
+    words = text.split()
+    if not words:
+        return False
+    english_like_chars = sum(1 for c in text if 'a' <= c.lower() <= 'z' or c.isdigit() or c in ' .,?!-\n\r\t')
+    english_ratio = english_like_chars / total_len
+    if english_ratio < 0.7 and indic_char_count == 0:
+        return False
+    return True
+
+
+def make_page(kind: str, length: int, rng: random.Random) -> str:
+    if kind == "english":
+        alphabet = "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJ 0123456789 .,\n"
+    elif kind == "devanagari":
+        alphabet = "".join(chr(cp) for cp in range(0x0905, 0x0939)) + " ।\n"
+    elif kind == "latin1_garbage":
+        alphabet = "abcdefghij " + "".join(chr(cp) for cp in range(0xC0, 0xFF))
+    elif kind == "cid":
+        return "".join(f"(cid:{rng.randint(1, 999)})" for _ in range(length // 8))
+    else:  # mixed: anything from the interesting ranges, used for the equivalence check
+        alphabet = "".join(chr(cp) for cp in (
+            list(range(0, 300)) + list(range(0x0900, 0x0E10)) + [0x0130, 0x212A, 0x00B2, 0x0966, 0xFF11, 0x4E00]
+        ))
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def bench(label, fn, pages):
+    start = time.perf_counter()
+    verdicts = [fn(page) for page in pages]
+    duration = time.perf_counter() - start
+    print(f"{label:<28} {duration * 1000:9.1f} ms  {len(pages) / duration:10.0f} pages/s")
+    return verdicts
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    page_len = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    _class_table()
+    print(f"class table build: {(time.perf_counter() - start) * 1000:.0f} ms (once per process)\n")
+
+    for kind in ("english", "devanagari", "latin1_garbage", "cid"):
+        pages = [make_page(kind, page_len, rng) for _ in range(page_count)]
+        print(f"{kind}: {page_count} pages x {page_len} chars")
+        old = bench("  legacy multi-pass", legacy_is_text_quality_good, pages)
+        new = bench("  table-driven", is_text_quality_good, pages)
+        sample = sample_pages(list(range(page_count)))
+        bench(f"  table-driven, {len(sample)}-page sample", is_text_quality_good, [pages[i] for i in sample])
+        if old != new:
+            print("  WARNING: verdicts differ")
+
+    # Randomized equivalence check over mixed-script text, short and long
+    mismatches = 0
+    for _ in range(5000):
+        text = make_page("mixed", rng.choice([3, 10, 50, 400]), rng)
+        mismatches += legacy_is_text_quality_good(text) != is_text_quality_good(text)
+    print(f"\nequivalence check: {mismatches} mismatches in 5000 random pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Checks that /api/ocr stops OCR and charges no credit when the client disconnects.
+Drives the ASGI app in-process (through its middleware) with a client that uploads
+a file and then hangs up, using a stand-in OCR call that waits to be cancelled.
+
+Run with: python scripts/test_disconnect.py  (or pytest scripts/test_disconnect.py)
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import main
+from app.services.vision_retry import OCRCancelled
+
+BOUNDARY = "disconnect-test-boundary"
+DISCONNECT_AFTER = 0.5  # Seconds between the end of the upload and the client hanging up
+
+
+class SlowVisionService:
+    """Stand-in for VisionService: 'recognizes' for up to 30 s unless cancelled"""
+
+    def __init__(self):
+        self.cancelled_at = None
+
+    def detect_text_from_path(self, file_path, cancel_event=None, **kwargs):
+        if cancel_event.wait(30):
+            self.cancelled_at = time.monotonic()
+            raise OCRCancelled("OCR request cancelled")
+        return "text"
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+def multipart_body() -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="scan.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + b"\x89PNG fake image" + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def post_and_disconnect(path: str):
+    body = multipart_body()
+    body_sent = threading.Event()
+    sent = []
+
+    async def receive():
+        if not body_sent.is_set():
+            body_sent.set()
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(DISCONNECT_AFTER)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    await main.app(scope, receive, send)
+    return sent
+
+
+def test_ocr_cancelled_on_disconnect():
+    service = SlowVisionService()
+    user = SimpleNamespace(id=1, ocr_credits=5)
+    session = FakeSession()
+    original_client = main.get_google_client
+    main.get_google_client = lambda: SimpleNamespace(get_vision_service=lambda: service)
+    main.app.dependency_overrides[main.get_current_user] = lambda: user
+    main.app.dependency_overrides[main.get_db] = lambda: session
+    try:
+        start = time.monotonic()
+        sent = asyncio.run(post_and_disconnect("/api/ocr"))
+        elapsed = time.monotonic() - start
+    finally:
+        main.get_google_client = original_client
+        main.app.dependency_overrides.clear()
+
+    assert service.cancelled_at is not None, "OCR was not cancelled after the client disconnected"
+    assert service.cancelled_at - start < DISCONNECT_AFTER + 2, "OCR was cancelled too late"
+    assert elapsed < 10, f"Request took {elapsed:.1f}s to wind down"
+    assert user.ocr_credits == 5 and session.commits == 0, "Credit was charged for a cancelled request"
+    status = next((m["status"] for m in sent if m["type"] == "http.response.start"), None)
+    print(f"Cancelled {service.cancelled_at - start:.2f}s after upload, response status {status}, credits kept")
+
+
+if __name__ == "__main__":
+    test_ocr_cancelled_on_disconnect()